@@ -0,0 +1,77 @@
+"""Measure how long the ductCalc modules take to import.
+
+Each module is imported in a fresh interpreter with ``python -X importtime``
+and the median cumulative import time of a few runs is reported. The run
+fails (exit status 1) if a module pulls in one of the heavy drawing/report
+libraries at import time, or takes longer than ``--max-ms``::
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --max-ms 150 duct_gui
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ('duct_core', 'flat_patterns', 'ductCalc', 'duct_gui', 'job_store', 'nesting')
+
+# Only loaded once a DXF or PDF is actually written
+HEAVY = ('ezdxf', 'reportlab')
+
+
+def import_profile(module: str) -> tuple:
+    """Import ``module`` in a new interpreter.
+
+    Returns its cumulative import time in ms and the set of top-level
+    packages imported along with it.
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO, capture_output=True, text=True, check=True)
+    total = None
+    packages = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        packages.add(name.strip().split('.')[0])
+        if name.rstrip() == f' {module}':
+            total = int(cumulative) / 1000.0
+    return total, packages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, help='Fail if a module takes longer')
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        times = []
+        for _ in range(args.runs):
+            ms, packages = import_profile(module)
+            times.append(ms)
+        median = statistics.median(times)
+        heavy = sorted(packages.intersection(HEAVY))
+        status = 'ok'
+        if heavy:
+            status = f"imports {', '.join(heavy)}"
+        elif args.max_ms is not None and median > args.max_ms:
+            status = f'over {args.max_ms:g} ms'
+        failed |= status != 'ok'
+        print(f'{module:<12} {median:8.1f} ms  (min {min(times):.1f})  {status}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""Benchmark the geometry kernels, DXF writers and exports on synthetic jobs.
+
+Every case runs on synthetic jobs of 10, 1,000 and 100,000 parts drawn from
+a catalogue of common sizes (so, like real takeoffs, sizes repeat). Each
+case and size runs in a fresh interpreter, which reports:
+
+* throughput in parts per second,
+* p50 / p95 latency per part after one untimed warm-up call (per run for
+  whole-job cases such as the PDF export, which are repeated ``--repeat``
+  times),
+* how far the peak resident memory grew while the case ran.
+
+Results can be saved as a baseline and later runs compared against it; a
+case whose throughput drops by more than ``--threshold`` counts as a
+regression and makes the run exit with status 1::
+
+    python benchmarks/suite.py --save             # record a baseline
+    python benchmarks/suite.py                    # compare against it
+    python benchmarks/suite.py --sizes 10,1000 draw_cone export_pdf
+
+Baselines are per machine and are kept in ``benchmarks/baselines/``.
+
+The catalogue only has a few hundred distinct parts, so the part caches
+would answer most calls of a big job. The on-disk DXF cache is switched off,
+and the calculation and drawing cases clear the in-memory ``dxf_cache`` and
+``metrics_cache`` before every call, so they measure the work itself. The
+``draw_cached`` case keeps the caches warm to measure a repeat-heavy job.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(REPO, 'benchmarks', 'baselines')
+
+SIZES = (10, 1000, 100000)
+
+# DXF cases keep at most this many files on disk. Deleting a batch is timed
+# but only lands in one call per batch, so it doesn't move p50/p95.
+FILES_PER_BATCH = 1000
+
+DIAMETERS = tuple(range(4, 38, 2))
+LENGTHS = tuple(range(12, 126, 6))
+GAUGES = (0.0239, 0.0299, 0.0359, 0.0478, 0.0598)
+
+
+def synthetic_job(n: int, kinds=('straight', 'straight', 'cone', 'elbow'),
+                  seed: int = 1) -> list:
+    """Return ``n`` parts as ``(kind, name, thickness, qty, dims)`` tuples.
+
+    Part kinds are picked from ``kinds`` at random, so repeating a kind makes
+    it more common.
+    """
+    rng = random.Random(seed)
+    job = []
+    for i in range(n):
+        kind = rng.choice(kinds)
+        thickness = rng.choice(GAUGES)
+        qty = float(rng.randint(1, 4))
+        dia = float(rng.choice(DIAMETERS))
+        if kind == 'straight':
+            dims = (dia, float(rng.choice(LENGTHS)))
+        elif kind == 'cone':
+            dims = (dia, dia + rng.choice((2, 4, 6, 8)), float(rng.choice((6, 12, 18))))
+        else:
+            dims = (dia, dia * 1.5, float(rng.choice((45, 90))))
+        job.append((kind, f'{kind}{i}', thickness, qty, dims))
+    return job
+
+
+# --- cases -------------------------------------------------------------------
+# Each case is set up for a job size and returns (mode, function, items):
+# 'part' cases call function(item) once per item, 'job' cases call
+# function(items) on the whole job.
+
+def _parts_of(size, kind):
+    return synthetic_job(size, (kind,))
+
+
+def case_get_cone_bbox(size, out_dir):
+    from duct_core import cone_pattern, get_cone_bbox
+
+    items = [cone_pattern(*dims)[:3] for _, _, _, _, dims in _parts_of(size, 'cone')]
+    return 'part', lambda args: get_cone_bbox(*args), items
+
+
+def case_straight_calc(size, out_dir):
+    from duct_core import straight_duct
+
+    items = [(t, *dims, qty) for _, _, t, qty, dims in _parts_of(size, 'straight')]
+    return 'part', lambda args: straight_duct(*args), items
+
+
+def case_cone_calc(size, out_dir):
+    from duct_core import reducing_cone
+
+    items = [(t, *dims) for _, _, t, _, dims in _parts_of(size, 'cone')]
+    return 'part', _cold(lambda args: reducing_cone(*args)), items
+
+
+def case_elbow_calc(size, out_dir):
+    from duct_core import gored_elbow
+
+    items = [(t, *dims, qty) for _, _, t, qty, dims in _parts_of(size, 'elbow')]
+    return 'part', lambda args: gored_elbow(*args), items
+
+
+def _cold(func):
+    """Call ``func`` with the part caches emptied first, so nothing is reused."""
+    from pattern_cache import dxf_cache, metrics_cache
+
+    def run(item):
+        dxf_cache.clear()
+        metrics_cache.clear()
+        return func(item)
+
+    return run
+
+
+def _files(out_dir, draw, cached=False):
+    count = 0
+
+    def run(args):
+        nonlocal count
+        count += 1
+        if count % FILES_PER_BATCH == 0:
+            _clear(out_dir)
+        draw(os.path.join(out_dir, f'{count % FILES_PER_BATCH}.dxf'), *args)
+
+    return run if cached else _cold(run)
+
+
+def _clear(out_dir):
+    for name in os.listdir(out_dir):
+        os.remove(os.path.join(out_dir, name))
+
+
+def case_draw_straight(size, out_dir):
+    import math
+
+    from duct_gui import draw_straight
+
+    items = [(dims[0] * math.pi, dims[1]) for _, _, _, _, dims in _parts_of(size, 'straight')]
+    return 'part', _files(out_dir, lambda f, w, l: draw_straight(w, l, f)), items
+
+
+def case_draw_cone(size, out_dir):
+    from duct_core import cone_pattern
+    from duct_gui import draw_cone
+
+    items = [cone_pattern(*dims)[:3] for _, _, _, _, dims in _parts_of(size, 'cone')]
+    return 'part', _files(out_dir, draw_cone), items
+
+
+def case_draw_gored_elbow(size, out_dir):
+    from gored_flat_pattern import draw_gored_elbow
+
+    items = [dims for _, _, _, _, dims in _parts_of(size, 'elbow')]
+    return 'part', _files(out_dir, draw_gored_elbow), items
+
+
+def case_draw_lite(size, out_dir):
+    import math
+
+    from flat_patterns import draw_arcs_and_connect, draw_straight
+    from duct_core import cone_pattern
+    from gored_flat_pattern import draw_gored_elbow
+
+    # The same mix of parts as a job, through the minimal R12 writer
+    drawers = {
+        'straight': (lambda f, w, l: draw_straight(w, l, f, writer='lite'),
+                     lambda dims: (dims[0] * math.pi, dims[1])),
+        'cone': (lambda f, *p: draw_arcs_and_connect(f, *p, writer='lite'),
+                 lambda dims: cone_pattern(*dims)[:3]),
+        'elbow': (lambda f, *p: draw_gored_elbow(f, *p, writer='lite'), tuple),
+    }
+    items = [(kind, drawers[kind][1](dims)) for kind, _, _, _, dims in synthetic_job(size)]
+    return 'part', _files(out_dir, lambda f, kind, params: drawers[kind][0](f, *params)), items
+
+
+def case_draw_cached(size, out_dir):
+    import math
+
+    from duct_core import cone_pattern
+    from duct_gui import draw_cone, draw_straight
+    from gored_flat_pattern import draw_gored_elbow
+
+    # A job's mix of parts with the caches kept, so repeated sizes are only
+    # written from the cached DXF text
+    drawers = {
+        'straight': (lambda f, w, l: draw_straight(w, l, f),
+                     lambda dims: (dims[0] * math.pi, dims[1])),
+        'cone': (draw_cone, lambda dims: cone_pattern(*dims)[:3]),
+        'elbow': (draw_gored_elbow, tuple),
+    }
+    items = [(kind, drawers[kind][1](dims)) for kind, _, _, _, dims in synthetic_job(size)]
+    return 'part', _files(out_dir, lambda f, kind, params: drawers[kind][0](f, *params),
+                          cached=True), items
+
+
+def _quote_rows(job):
+    from duct_core import gored_elbow, reducing_cone, straight_duct
+
+    rows = []
+    for kind, name, t, qty, dims in job:
+        if kind == 'straight':
+            circ, weight, sqft = straight_duct(t, *dims, qty)
+            rows.append([name, 'Straight', qty, t, dims[0], circ, dims[1], weight, sqft])
+        elif kind == 'cone':
+            _, _, _, width, length, weight, sqft = reducing_cone(t, *dims)
+            rows.append([name, 'Reducing Cone', qty, t, dims[0], width, length, weight, sqft])
+        else:
+            width, length, weight, sqft = gored_elbow(t, *dims, qty)
+            rows.append([name, 'Gored Elbow', qty, t, dims[0], width, length, weight, sqft])
+    return rows
+
+
+def case_csv_write(size, out_dir):
+    import duct_gui
+    from duct_table import DuctTable
+    from rollups import QuoteReport
+
+    duct_gui.csv_filename = os.path.join(out_dir, 'quote.csv')
+    duct_gui.quote_csv = None
+    duct_gui.ducts = DuctTable()
+    duct_gui.report = QuoteReport(duct_gui.REPORT_GROUPINGS)
+
+    def run(row):
+        duct_gui.ducts.append(*row)
+        duct_gui.report.add_rows([row])
+        duct_gui.csv_write([row], duct_gui.csv_footer())
+
+    return 'part', run, _quote_rows(synthetic_job(size))
+
+
+def case_export_pdf(size, out_dir):
+    from duct_table import COLUMNS
+    from quote_pdf import write_quote_pdf
+
+    runs = 0
+
+    def run(rows):
+        nonlocal runs
+        runs += 1
+        totals = [sum(row[i] for row in rows) for i in (2, 7, 8)]
+        total_row = ['Total', totals[0], '', '', '', '', '', totals[1], totals[2]]
+        by_thickness = {}
+        for row in rows:
+            weight, sqft = by_thickness.get(row[3], (0.0, 0.0))
+            by_thickness[row[3]] = (weight + row[7], sqft + row[8])
+        summary = [(t, w, s) for t, (w, s) in sorted(by_thickness.items())]
+        write_quote_pdf(os.path.join(out_dir, f'quote{runs}.pdf'), iter(rows), total_row,
+                        summary, COLUMNS)
+
+    return 'job', run, _quote_rows(synthetic_job(size))
+
+
+CASES = {
+    name[len('case_'):]: func for name, func in globals().items() if name.startswith('case_')
+}
+
+
+# --- measuring ---------------------------------------------------------------
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_case(case: str, size: int, repeat: int) -> dict:
+    """Run one case in this process and return its measurements."""
+    sys.path.insert(0, REPO)
+    out_dir = tempfile.mkdtemp(prefix='ductcalc-bench-')
+    try:
+        mode, func, items = CASES[case](size, out_dir)
+        # Warm up untimed, e.g. so lazy imports don't count as latency
+        func(items[0] if mode == 'part' else items[:1])
+        rss_before = _peak_rss_mb()
+        timings = []
+        clock = time.perf_counter
+        start = clock()
+        if mode == 'part':
+            for item in items:
+                t0 = clock()
+                func(item)
+                timings.append(clock() - t0)
+            parts = len(items)
+        else:
+            for _ in range(repeat):
+                t0 = clock()
+                func(items)
+                timings.append(clock() - t0)
+            parts = len(items) * repeat
+        elapsed = clock() - start
+        rss_after = _peak_rss_mb()
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    timings.sort()
+    return {
+        'case': case, 'size': size, 'mode': mode, 'calls': len(timings),
+        'seconds': elapsed, 'throughput': parts / elapsed if elapsed else float('inf'),
+        'p50_ms': _percentile(timings, 0.50) * 1e3,
+        'p95_ms': _percentile(timings, 0.95) * 1e3,
+        'peak_mb': None if rss_before is None else rss_after - rss_before,
+    }
+
+
+def run_child(case: str, size: int, repeat: int) -> dict:
+    env = dict(os.environ, DUCTCALC_DXF_CACHE='off')
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', case, str(size),
+         '--repeat', str(repeat)],
+        env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f'{case} ({size} parts) failed:\n{proc.stderr}')
+    return json.loads(proc.stdout)
+
+
+def baseline_path() -> str:
+    return os.path.join(BASELINE_DIR, f'{platform.node() or "default"}.json')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('cases', nargs='*', help=f'Cases to run (default all: {", ".join(CASES)})')
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)),
+                        help='Comma separated job sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of whole-job cases')
+    parser.add_argument('--baseline', default=baseline_path(), help='Baseline JSON file')
+    parser.add_argument('--save', action='store_true', help='Save the results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed throughput drop against the baseline (0.25 = 25%%)')
+    parser.add_argument('--child', nargs=2, metavar=('CASE', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(args.child[0], int(args.child[1]), args.repeat)))
+        return 0
+
+    cases = args.cases or list(CASES)
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f'unknown case(s): {", ".join(sorted(unknown))}')
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+
+    print(f'{"case":<18}{"parts":>8}{"parts/s":>12}{"p50 ms":>10}{"p95 ms":>10}'
+          f'{"peak MB":>9}  vs baseline')
+    results = {}
+    regressions = 0
+    for case in cases:
+        for size in sizes:
+            result = run_child(case, size, args.repeat)
+            key = f'{case}/{size}'
+            results[key] = result
+            note = ''
+            old = baseline.get(key)
+            if old:
+                change = result['throughput'] / old['throughput'] - 1.0
+                note = f'{change:+.0%}'
+                if change < -args.threshold:
+                    note += '  REGRESSION'
+                    regressions += 1
+            peak = '-' if result['peak_mb'] is None else f'{result["peak_mb"]:.1f}'
+            print(f'{case:<18}{size:>8}{result["throughput"]:>12,.0f}{result["p50_ms"]:>10.3f}'
+                  f'{result["p95_ms"]:>10.3f}{peak:>9}  {note}', flush=True)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as fp:
+            json.dump(results, fp, indent=1, sort_keys=True)
+        print(f'Saved baseline to {args.baseline}')
+    if regressions:
+        print(f'{regressions} regression(s) beyond {args.threshold:.0%}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -46,18 +46,9 @@ def create_duct():
         writer.writerows(zip(nameList, qtyList, thicknessList, diaList, circList, lengthList, weightList, sqftList))
         writer.writerow(['Total:', sum(qtyList), '', '', '', '', sum(weightList), sum(sqftList)])
 
-    # Create a DXF file for each duct
-    for i in range(1, len(nameList)):
-        doc = ezdxf.new(dxfversion='R2010')
-        msp = doc.modelspace()
-        
-        circ = circList[i]
-        length = lengthList[i]
-        
-        msp.add_lwpolyline([(0, 0), (0, circ), (length, circ), (length, 0)], close=True)
-        
-        duct_name = nameList[i].replace(" ", "_")  # Replace spaces with underscores
-        doc.saveas(f"{duct_name}.dxf")
+    # Only the new part needs a DXF, the others are already on disk
+    dirty_parts.add(len(nameList) - 1)
+    draw_dirty_parts()
 
     # Clear input fields
     name_entry.delete(0, tk.END)
@@ -69,6 +60,34 @@ def create_duct():
     # Display CSV content on the screen
     display_csv_content(total_qty, total_sqft, total_weight)
 
+def draw_duct(i):
+    doc = ezdxf.new(dxfversion='R2010')
+    msp = doc.modelspace()
+
+    circ = circList[i]
+    length = lengthList[i]
+
+    msp.add_lwpolyline([(0, 0), (0, circ), (length, circ), (length, 0)], close=True)
+
+    duct_name = nameList[i].replace(" ", "_")  # Replace spaces with underscores
+    doc.saveas(f"{duct_name}.dxf")
+    drawn_parts[duct_name] = (circ, length)
+
+def draw_dirty_parts():
+    # Draw the parts marked dirty, skipping any whose file already holds
+    # the same geometry
+    for i in sorted(dirty_parts):
+        duct_name = nameList[i].replace(" ", "_")
+        if drawn_parts.get(duct_name) != (circList[i], lengthList[i]):
+            draw_duct(i)
+    dirty_parts.clear()
+
+def regenerate_all():
+    # Redraw every part in the job, e.g. after DXF files were deleted
+    drawn_parts.clear()
+    dirty_parts.update(range(len(nameList)))
+    draw_dirty_parts()
+
 def display_csv_content(total_qty, total_sqft, total_weight):
     csv_content.delete(1.0, tk.END)
     with open('duct_data.csv', 'r') as file:
@@ -92,6 +111,11 @@ lengthList = []
 weightList = []
 sqftList = []
 
+# DXF bookkeeping: indexes of parts that still need drawing and the
+# geometry last written to each file
+dirty_parts = set()
+drawn_parts = {}
+
 # Create the main window
 root = tk.Tk()
 root.title("Duct Calculator")
@@ -121,6 +145,9 @@ length_entry.grid(row=4, column=1, padx=5, pady=5)
 create_button = ttk.Button(root, text="Create Duct", command=create_duct)
 create_button.grid(row=5, columnspan=2, padx=5, pady=10)
 
+regenerate_button = ttk.Button(root, text="Regenerate All DXFs", command=regenerate_all)
+regenerate_button.grid(row=7, columnspan=2, padx=5, pady=5)
+
 # Create text widget to display CSV content
 csv_content = tk.Text(root, height=10, width=70)
 csv_content.grid(row=6, columnspan=2, padx=5, pady=5)
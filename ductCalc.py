@@ -1,7 +1,14 @@
+import argparse
 import csv
-import math
-import ezdxf
-from ezdxf import units
+import json
+import os
+import sys
+from itertools import islice
+from duct_core import (DxfPart, check_cone, cone_values, get_arc, get_cone_bbox, get_length, get_p,
+                       get_r, get_sagitta, getStraightSqft, getStraightWeight, straight_values)
+from flat_patterns import add_arcs_and_connect, add_straight, draw_arcs_and_connect, draw_straight
+import timing
+from timing import stage
 
 def getName():
     print("Enter the duct name: ")
@@ -28,15 +35,6 @@ def getLength():
     length = float(input())
     return length
 
-#.2833 steel weight per cubic inch
-def getStraightWeight(length, width, thickness, qty):
-    weight = float(qty * ((length * width * thickness) * 0.2833))
-    return weight
-
-def getStraightSqft(length, width, qty):
-    sqft = float(qty * ((length * width) / 144))
-    return sqft
-
 #Cone Calcs
 def get_small_dia():
     print("Small Diameter: ", end="")
@@ -58,130 +56,200 @@ def get_thick():
     h = float(input())
     return h
 
-def get_r(x, y, z):
-    r = math.sqrt((0.5 * x - 0.5 * y) ** 2 + z ** 2)
-    return r
-
-def get_p(x, y, z):
-    p = x * (math.sqrt((0.5 * x - 0.5 * y) ** 2 + z ** 2)) / (y - z)
-    return p
-
-def get_length(x, y, z):
-    d = (2 * x) * math.sin(y / (2 * x)) + z * 2
-    return d
-
-def get_arc(x, y, z):
-    d = (2 * x) * math.sin(y / (2 * x)) + z * 2
-    return d
-
-def get_sagitta(x, y):
-    s = x - (math.sqrt(x ** 2 - (y / 2) ** 2))
-    return s
-
-
-def get_cone_bbox(inner_radius: float, outer_radius: float, angle_deg: float) -> tuple:
-    """Return width and height of the bounding box for a cone flat pattern."""
-    angles = [0, angle_deg]
-    for a in (90, 180, 270, 360):
-        if 0 < a < angle_deg:
-            angles.append(a)
-    xs, ys = [], []
-    for ang in angles:
-        rad = math.radians(ang)
-        for r in (inner_radius, outer_radius):
-            xs.append(r * math.cos(rad))
-            ys.append(r * math.sin(rad))
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(0, min(ys)), max(ys)
-    width = max_x - min_x
-    height = max_y - min_y
-    return width, height
-
-def draw_straight(width, length, filename):
-    doc = ezdxf.new()
-    doc.units = units.IN
-    doc.header['$INSUNITS'] = units.IN
-    doc.header['$MEASUREMENT'] = 0
-    msp = doc.modelspace()
-
-    start = (0,0)
-    msp.add_line((start), (width, 0))
-    msp.add_line((width, 0), (width, length))
-    msp.add_line((width, length), (0, length))
-    msp.add_line((0, length), (start))
-    doc.saveas(filename)
-
-def draw_arcs_and_connect(filename, radius1, radius2, end_angle):
-    # Create a new DXF drawing
-    doc = ezdxf.new()
-    doc.units = units.IN
-    doc.header['$INSUNITS'] = units.IN
-    doc.header['$MEASUREMENT'] = 0
-    # Add a new model space layout
-    msp = doc.modelspace()
-
-    # Define the center of the arcs
-    center = (0, 0)
-
-    # Define the start and end angles of the arcs
-    start_angle = 0
-
-    # Draw the first arc
-    msp.add_arc(center=center, radius=radius1, start_angle=start_angle, end_angle=end_angle)
-
-    # Calculate the start and endpoint of the first arc
-    x1_start = center[0] + radius1 * math.cos(math.radians(start_angle))
-    y1_start = center[1] + radius1 * math.sin(math.radians(start_angle))
-    x1_end = center[0] + radius1 * math.cos(math.radians(end_angle))
-    y1_end = center[1] + radius1 * math.sin(math.radians(end_angle))
-
-    # Draw the second arc
-    msp.add_arc(center=center, radius=radius2, start_angle=start_angle, end_angle=end_angle)
-
-    # Calculate the start and endpoint of the second arc
-    x2_start = center[0] + radius2 * math.cos(math.radians(start_angle))
-    y2_start = center[1] + radius2 * math.sin(math.radians(start_angle))
-    x2_end = center[0] + radius2 * math.cos(math.radians(end_angle))
-    y2_end = center[1] + radius2 * math.sin(math.radians(end_angle))
-
-    # Connect the starting points of the arcs with lines
-    msp.add_line((x1_start, y1_start), (x2_start, y2_start))  # Connect the starting points of the arcs
-
-    # Connect the endpoints of the arcs with lines
-    msp.add_line((x1_end, y1_end), (x2_end, y2_end))  # Connect the endpoints of the arcs
-
-    # Save the DXF file
-    doc.saveas(filename)
-
 # Start of runtime program
 
-# Lists
-nameList =          ["Name"]
-qtyList =           ["QTY"]
-thicknessList =     ["Thickness"]
-diaList =           ["Diameter"]
-circList =          ["Flat Width"]
-lengthList =        ["Flat Length"]
-weightList =        ["Total Weight"]
-sqftList =          ["Total SQFT"]
-
-# Loop that keeps asking for input
-# Loop that keeps asking for input
-while True:
+HEADER = ["Name", "QTY", "Thickness", "Diameter", "Flat Width", "Flat Length", "Total Weight", "Total SQFT"]
+
+STRAIGHT_TYPES = ('S', 'STRAIGHT')
+CONE_TYPES = ('C', 'CONE', 'REDUCING CONE')
+
+# Parts between progress reports in batch mode
+PROGRESS_EVERY = 1000
+
+# Duct type names of the part kinds, as the GUI shows them
+BATCH_TYPES = {'straight': 'Straight', 'cone': 'Reducing Cone'}
+
+def write_csv(rows, filename='duct_data.csv'):
+    with open(filename, 'w', newline='') as file:
+        writer = csv.writer(file)
+        for data in rows:
+            writer.writerow(data)
+
+# Takeoff parsing
+def _field(record, *keys):
+    for key in keys:
+        value = record.get(key)
+        if value not in (None, ''):
+            return float(value)
+    raise KeyError(keys[0])
+
+def read_takeoff(filename):
+    """Yield ``(line_number, record)`` pairs from a CSV or JSONL takeoff.
+
+    CSV takeoffs need a header row; JSONL takeoffs have one object per line.
+    Both use the columns ``type``, ``name``, ``qty``, ``thickness`` and then
+    ``dia``/``length`` for straights or ``small_dia``/``large_dia``/``height``
+    for cones.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    with open(filename, newline='') as file:
+        if ext in ('.jsonl', '.ndjson', '.json'):
+            for n, line in enumerate(file, 1):
+                if line.strip():
+                    yield n, json.loads(line)
+        else:
+            reader = csv.DictReader(file)
+            for n, record in enumerate(reader, 2):
+                record = {k.strip().lower(): v for k, v in record.items() if k}
+                if any(v for v in record.values()):
+                    yield n, record
+
+def takeoff_row(record):
+    """Return ``(csv_row, kind, draw_params)`` for one takeoff record."""
+    kind = str(record.get('type', '')).strip().upper()
+    name = str(record['name'])
+    qty = _field(record, 'qty')
+    thickness = _field(record, 'thickness')
+    if kind in STRAIGHT_TYPES:
+        dia = _field(record, 'dia', 'diameter')
+        length = _field(record, 'length')
+        circ, weight, sqft = straight_values(qty, thickness, dia, length)
+        row = [name, qty, thickness, dia, circ, length, weight, sqft]
+        return row, 'straight', (circ, length)
+    if kind in CONE_TYPES:
+        s_dia = _field(record, 'small_dia', 'small_diameter')
+        l_dia = _field(record, 'large_dia', 'large_diameter')
+        height = _field(record, 'height', 'length')
+        check_cone(s_dia, l_dia, height)
+        p, q, d, b_width, b_length, b_weight, b_sqft = cone_values(thickness, s_dia, l_dia, height)
+        row = [name, qty, thickness, s_dia, b_width, b_length, b_weight, b_sqft]
+        return row, 'cone', (p, q, d)
+    raise ValueError(f"unknown duct type {record.get('type')!r}")
+
+def iter_takeoff(takeoff):
+    """Yield ``(csv_row, DxfPart)`` for each takeoff line, reading lazily."""
+    for n, record in read_takeoff(takeoff):
+        try:
+            with stage('compute'):
+                row, kind, params = takeoff_row(record)
+        except (KeyError, ValueError, ArithmeticError) as exc:
+            raise ValueError(f"{takeoff}:{n}: bad takeoff row: {exc}") from exc
+        yield row, DxfPart(kind, row[0], params)
+
+def read_csv_rows(filename, count):
+    """Yield the first ``count`` data rows of a batch CSV with numbers as floats."""
+    with open(filename, newline='') as file:
+        reader = csv.reader(file)
+        next(reader)
+        for row in islice(reader, count):
+            yield [row[0]] + [float(v) for v in row[1:]]
+
+def write_pdf_report(rows, report, filename):
+    """Write batch rows and their ``QuoteReport`` as a quote PDF; no browser is opened."""
+    from quote_pdf import write_quote_pdf
+
+    total = report.total
+    total_row = ['Total', total.qty, '', '', '', '', total.weight, total.sqft]
+    return write_quote_pdf(filename, rows, total_row, report.summary(), HEADER,
+                           groups=report.summaries())
+
+def run_batch(takeoff, output='duct_data.csv', draw=True, workers=1, job_dxf=None, nest_sheets=None, pdf=None,
+              progress=None, writer=None, archive=None):
+    """Process a whole takeoff file without prompting.
+
+    Writes the same ``duct_data.csv`` layout as the interactive loop, plus a
+    totals footer per thickness, type and diameter band (see ``rollups``),
+    and a ``{name}.dxf`` per part, drawn over ``workers`` processes. With
+    ``job_dxf`` all parts go into that one DXF as block inserts instead. With ``nest_sheets`` (a list of stock
+    ``(width, length)`` sizes) the parts are also nested onto sheets per
+    thickness and the sheets written as DXFs. With ``pdf`` a quote report is
+    written to that file as well. ``progress(count)`` is called every
+    ``PROGRESS_EVERY`` parts and once at the end. ``writer`` picks the
+    per-part DXF writer, ``'ezdxf'`` or ``'lite'`` (see ``dxf_lite``). With
+    ``archive`` the per-part DXFs go into that one ZIP file, with a manifest,
+    instead of the current directory.
+
+    The takeoff is streamed: each line is parsed, costed, written to the CSV
+    and handed to the DXF writers as it is read, and only running totals are
+    kept, so memory use doesn't grow with the takeoff. The CSV is written to
+    ``output + '.part'`` and only renamed to ``output`` once every row is
+    in, so a bad takeoff line leaves no half-written CSV. The PDF is written
+    from the finished CSV, and the job DXF and nesting read the takeoff a
+    second time (nesting itself still holds every part of a thickness).
+    Returns the number of parts processed.
+    """
+    from dxf_jobs import generate_dxfs, write_dxf_zip
+    from rollups import QuoteReport, display_row
+
+    report = QuoteReport(('thickness', 'type', 'diameter'))
+    partial = output + '.part'
+    try:
+        with open(partial, 'w', newline='') as file:
+            csv_out = csv.writer(file)
+            csv_out.writerow(HEADER)
+
+            def parts():
+                for row, part in iter_takeoff(takeoff):
+                    with stage('persist_row'):
+                        csv_out.writerow(row)
+                    report.add(BATCH_TYPES[part.kind], row[1], row[2], row[3], row[6], row[7])
+                    if progress is not None and report.total.count % PROGRESS_EVERY == 0:
+                        progress(report.total.count)
+                    yield part
+
+            if draw and not job_dxf:
+                if archive:
+                    results = write_dxf_zip(parts(), archive, workers=workers, writer=writer)
+                else:
+                    results = generate_dxfs(parts(), workers=workers, writer=writer)
+                for result in results:
+                    if result.error:
+                        print(f"Failed to draw {result.name}: {result.error}")
+            else:
+                for _ in parts():
+                    pass
+            csv_out.writerows(map(display_row, report.footer()))
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.replace(partial, output)
+    if progress is not None:
+        progress(report.total.count)
+    if pdf:
+        write_pdf_report(read_csv_rows(output, report.total.count), report, pdf)
+    if draw and job_dxf:
+        from job_dxf import write_job_dxf
+        write_job_dxf(((part, row[1]) for row, part in iter_takeoff(takeoff)), job_dxf)
+    if nest_sheets:
+        from nesting import nest_parts, write_sheet_dxfs
+        nest = nest_parts(((part, row[1], row[2]) for row, part in iter_takeoff(takeoff)), nest_sheets)
+        for thickness, result in nest.items():
+            print(f"Thickness {thickness}: {result.sheet_count} sheets, "
+                  f"{result.utilisation:.1%} used, {len(result.oversize)} oversize parts")
+        write_sheet_dxfs(nest, os.path.splitext(output)[0] + '_sheet')
+    return report.total.count
+
+def print_progress(count):
+    print(f"\r{count} parts", end='', file=sys.stderr, flush=True)
+
+def interactive(output='duct_data.csv'):
+    rows = [HEADER]
+
+    # Loop that keeps asking for input
+    while True:
         type = input("Duct type 'S' for Straight 'C' for Cone or '0' to quit:")
         if type == "0":
             break
         # Variables
         if type == 'S':
             name = getName()
-            qty = getQty()       
-            thickness = getThickness()       
-            dia = getDia()        
-            circ = dia * math.pi        
-            length = getLength()        
-            weight = getStraightWeight(length, circ, thickness, qty)
-            sqft = getStraightSqft(length, circ, qty)        
-            
+            qty = getQty()
+            thickness = getThickness()
+            dia = getDia()
+            length = getLength()
+            circ, weight, sqft = straight_values(qty, thickness, dia, length)
+
             # Debug print statements
             print("Appending Straight duct values to lists:")
             print("Name:", name)
@@ -191,39 +259,21 @@ while True:
             print("Length:", length)
             print("Weight:", weight)
             print("SQFT:", sqft)
-            
-            # Adding variables to lists 
-            nameList.append(name)
-            qtyList.append(qty)
-            thicknessList.append(thickness)
-            diaList.append(dia)
-            circList.append(circ)
-            lengthList.append(length)
-            weightList.append(weight)
-            sqftList.append(sqft)
-            
+
+            rows.append([name, qty, thickness, dia, circ, length, weight, sqft])
+
             #Draw the duct
             draw_straight(circ, length, name + '.dxf')
-        
+
         elif type == 'C':
-            steel_weight = 0.2833
             name = getName()
-            qty = getQty()       
-            thickness = getThickness() 
+            qty = getQty()
+            thickness = getThickness()
             s_dia = get_small_dia()  # User input
             l_dia = get_large_dia()  # User input
             height = get_height()  # User input
-            r = get_r(l_dia, s_dia, height)  # Slant height
-            p = get_p(height, l_dia, s_dia)  # Flat pattern inside radius
-            q = r + p  # Flat pattern outside radius (large diameter)
-            l_inner_arc = 3.14 * s_dia  # Length of inner arc along perimeter
-            a = l_inner_arc / p  # Angle in radians
-            d = (a * 180) / 3.14  # Angle in degrees
-            b_width, b_length = get_cone_bbox(p, q, d)
-            b_sqft = (b_width * b_length)/144
-            b_volume = b_width * b_length * thickness
-            b_weight = b_volume * steel_weight
-            
+            p, q, d, b_width, b_length, b_weight, b_sqft = cone_values(thickness, s_dia, l_dia, height)
+
             # Debug print statements
             print("Appending Cone duct values to lists:")
             print("Name:", name)
@@ -234,24 +284,43 @@ while True:
             print("Height:", height)
             print("Weight:", b_weight)
             print("SQFT:", b_sqft)
-            
-            # Adding variables to lists
-            nameList.append(name)
-            qtyList.append(qty)
-            thicknessList.append(thickness)
-            diaList.append(s_dia)
-            circList.append(b_width)
-            lengthList.append(b_length)
-            weightList.append(b_weight)
-            sqftList.append(b_sqft)
+
+            rows.append([name, qty, thickness, s_dia, b_width, b_length, b_weight, b_sqft])
 
             #draw the duct
             draw_arcs_and_connect(name +'.dxf', p, q, d)
 
-
-# Writing to CSV file
-# Writing to CSV file
-with open('duct_data.csv', 'w', newline='') as file:
-    writer = csv.writer(file)
-    for data in zip(nameList, qtyList, thicknessList, diaList, circList, lengthList, weightList, sqftList, ):
-        writer.writerow(data)
+    # Writing to CSV file
+    write_csv(rows, output)
+
+def main():
+    parser = argparse.ArgumentParser(description="Duct flat pattern calculator")
+    parser.add_argument("takeoff", nargs="?", help="CSV or JSONL takeoff to process without prompting")
+    parser.add_argument("-o", "--output", default="duct_data.csv", help="Output CSV filename")
+    parser.add_argument("--no-dxf", action="store_true", help="Skip writing the per-part DXF files")
+    parser.add_argument("--job-dxf", metavar="FILE", help="Write all parts into one DXF of block inserts instead of a DXF per part")
+    parser.add_argument("--zip", action="store_true", help="Write the per-part DXFs into one ZIP next to the output CSV instead of the current directory")
+    parser.add_argument("--nest", metavar="WxL", action="append", help="Nest the parts onto stock sheets of this size, e.g. 48x96 (repeat for more sizes)")
+    parser.add_argument("--pdf", metavar="FILE", help="Also write a PDF quote report (the browser is not opened)")
+    parser.add_argument("--timings", action="store_true", help="Print per-stage timings at exit (not counting -j worker processes)")
+    parser.add_argument("--profile", metavar="FILE", help="Write a cProfile/pstats file of the run")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="Worker processes for DXF generation (0 = one per CPU)")
+    parser.add_argument("--dxf-writer", choices=("ezdxf", "lite"), help="DXF writer for the per-part files; 'lite' writes minimal R12 files much faster (default: ezdxf, or $DUCTCALC_DXF_WRITER)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Don't show batch progress")
+    args = parser.parse_args()
+    if args.timings or args.profile:
+        timing.enable(args.profile)
+    if args.takeoff:
+        nest_sheets = [tuple(float(v) for v in size.lower().split('x')) for size in args.nest or []]
+        count = run_batch(args.takeoff, args.output, draw=not args.no_dxf, workers=args.workers,
+                          job_dxf=args.job_dxf, nest_sheets=nest_sheets, pdf=args.pdf,
+                          progress=None if args.quiet else print_progress, writer=args.dxf_writer,
+                          archive=os.path.splitext(args.output)[0] + '.zip' if args.zip else None)
+        if not args.quiet:
+            print(file=sys.stderr)
+        print(f"Processed {count} parts into {args.output}")
+    else:
+        interactive(args.output)
+
+if __name__ == "__main__":
+    main()
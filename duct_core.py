@@ -0,0 +1,175 @@
+"""Duct geometry and costing without any drawing or report dependencies.
+
+Everything here only needs the standard library, so the GUI, the batch mode
+and scripts can import it in a few milliseconds; ezdxf and reportlab are
+only loaded by the modules that actually write a DXF or a PDF.
+
+There are two sets of costing functions, kept apart because they don't give
+the same numbers: :func:`straight_values` and :func:`cone_values` are the
+command line calculator's (0.2833 lb/in^3 steel, pi as 3.14 for cones) and
+:func:`straight_duct`, :func:`reducing_cone` and :func:`gored_elbow` are the
+GUI's (0.2836 lb/in^3, ``math.pi``).
+"""
+
+from __future__ import annotations
+
+import math
+from typing import NamedTuple
+
+from pattern_cache import memoized
+
+# Steel weight in lb per cubic inch used by the GUI
+STEEL_WEIGHT = 0.2836
+
+
+class DxfPart(NamedTuple):
+    """One flat pattern to draw.
+
+    ``params`` are ``(width, length)`` for straights,
+    ``(radius1, radius2, end_angle)`` for cones and
+    ``(diameter, clr, angle_deg[, num_gores[, points_per_gore]])`` for
+    gored elbows.
+    """
+
+    kind: str
+    name: str
+    params: tuple
+
+
+# --- geometry --------------------------------------------------------------
+
+def get_r(x, y, z):
+    r = math.sqrt((0.5 * x - 0.5 * y) ** 2 + z ** 2)
+    return r
+
+
+def get_p(x, y, z):
+    p = x * (math.sqrt((0.5 * x - 0.5 * y) ** 2 + z ** 2)) / (y - z)
+    return p
+
+
+def get_length(x, y, z):
+    d = (2 * x) * math.sin(y / (2 * x)) + z * 2
+    return d
+
+
+def get_arc(x, y, z):
+    d = (2 * x) * math.sin(y / (2 * x)) + z * 2
+    return d
+
+
+def get_sagitta(x, y):
+    s = x - (math.sqrt(x ** 2 - (y / 2) ** 2))
+    return s
+
+
+def get_cone_bbox(inner_radius: float, outer_radius: float, angle_deg: float) -> tuple:
+    """Return width and height of the bounding box for a cone flat pattern."""
+    angles = [0, angle_deg]
+    for a in (90, 180, 270, 360):
+        if 0 < a < angle_deg:
+            angles.append(a)
+    xs, ys = [], []
+    for ang in angles:
+        rad = math.radians(ang)
+        for r in (inner_radius, outer_radius):
+            xs.append(r * math.cos(rad))
+            ys.append(r * math.sin(rad))
+    min_x, max_x = min(xs), max(xs)
+    min_y, max_y = min(0, min(ys)), max(ys)
+    width = max_x - min_x
+    height = max_y - min_y
+    return width, height
+
+
+# --- command line costing --------------------------------------------------
+
+#.2833 steel weight per cubic inch
+def getStraightWeight(length, width, thickness, qty):
+    weight = float(qty * ((length * width * thickness) * 0.2833))
+    return weight
+
+
+def getStraightSqft(length, width, qty):
+    sqft = float(qty * ((length * width) / 144))
+    return sqft
+
+
+@memoized
+def straight_values(qty, thickness, dia, length):
+    """Return flat width, weight and SQFT for a straight duct."""
+    circ = dia * math.pi
+    weight = getStraightWeight(length, circ, thickness, qty)
+    sqft = getStraightSqft(length, circ, qty)
+    return circ, weight, sqft
+
+
+@memoized
+def cone_values(thickness, s_dia, l_dia, height):
+    """Return the flat pattern radii, angle and bbox values for a cone."""
+    steel_weight = 0.2833
+    r = get_r(l_dia, s_dia, height)  # Slant height
+    p = get_p(height, l_dia, s_dia)  # Flat pattern inside radius
+    q = r + p  # Flat pattern outside radius (large diameter)
+    l_inner_arc = 3.14 * s_dia  # Length of inner arc along perimeter
+    a = l_inner_arc / p  # Angle in radians
+    d = (a * 180) / 3.14  # Angle in degrees
+    b_width, b_length = get_cone_bbox(p, q, d)
+    b_sqft = (b_width * b_length)/144
+    b_volume = b_width * b_length * thickness
+    b_weight = b_volume * steel_weight
+    return p, q, d, b_width, b_length, b_weight, b_sqft
+
+
+def check_cone(s_dia, l_dia, height):
+    """Raise ``ValueError`` unless the cone dimensions give a flat pattern.
+
+    The pattern radii divide by ``l_dia - s_dia``, so a cone must get wider
+    (``0 < s_dia < l_dia``) and have a positive height.
+    """
+    if not 0 < s_dia < l_dia:
+        raise ValueError(f"cone needs 0 < small diameter < large diameter, "
+                         f"not {s_dia:g} and {l_dia:g}")
+    if height <= 0:
+        raise ValueError(f"cone height must be positive, not {height:g}")
+
+
+# --- GUI costing -----------------------------------------------------------
+
+@memoized
+def cone_pattern(s_dia, l_dia, height):
+    """Return the flat pattern radii, sweep angle and bbox of a cone."""
+    r = get_r(l_dia, s_dia, height)  # Slant height
+    p = get_p(height, l_dia, s_dia)  # Flat pattern inside radius
+    q = r + p  # Flat pattern outside radius (large diameter)
+    l_inner_arc = math.pi * s_dia  # Length of inner arc
+    a = l_inner_arc / p
+    d = (a * 180) / math.pi
+    b_width, b_length = get_cone_bbox(p, q, d)
+    return p, q, d, b_width, b_length
+
+
+def straight_duct(thickness, diameter, length, qty):
+    """Return circumference, weight and SQFT of ``qty`` straight ducts."""
+    circumference = diameter * math.pi
+    weight = ((circumference * length * thickness) * STEEL_WEIGHT) * qty
+    sqft = ((circumference * length) / 144) * qty
+    return circumference, weight, sqft
+
+
+def reducing_cone(thickness, s_dia, l_dia, height):
+    """Return ``(p, q, d, b_width, b_length, b_weight, b_sqft)`` of one cone."""
+    p, q, d, b_width, b_length = cone_pattern(s_dia, l_dia, height)
+    b_sqft = (b_width * b_length) / 144
+    b_volume = b_width * b_length * thickness
+    b_weight = b_volume * STEEL_WEIGHT
+    return p, q, d, b_width, b_length, b_weight, b_sqft
+
+
+def gored_elbow(thickness, diameter, clr, degree, qty):
+    """Return bbox width, bbox length, weight and SQFT of ``qty`` elbows."""
+    blength = clr * 2
+    bwidth = diameter * math.pi
+    sqft = ((((blength * bwidth) / 144) * degree) / 90) * qty
+    weight = (sqft * 144 * thickness * STEEL_WEIGHT)
+    return bwidth, blength, weight, sqft
@@ -1,211 +1,220 @@
-import csv
-import math
+import os
 import tkinter as tk
-from tkinter import ttk
-import ezdxf
-from ezdxf import units
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Spacer
+from tkinter import messagebox, ttk
 import webbrowser
-
-# Lists used to store duct data
-duct_name_list = []
-duct_type_list = []
-duct_qty_list = []
-duct_thickness_list = []
-duct_bwidth_list = []
-duct_blength_list = []
-duct_total_sqft_list = []
-duct_total_weight_list = []
-duct_diameter = []
-weight_by_thickness = {}
-sqft_by_thickness = {}
+from duct_core import DxfPart, gored_elbow, reducing_cone, straight_duct
+from duct_table import COLUMNS, DuctTable
+from flat_patterns import add_arcs_and_connect, add_straight
+from gored_flat_pattern import draw_gored_elbow
+from gui_worker import Cancelled, Worker
+from job_store import default_store
+from nesting import nest_parts, write_sheet_dxfs
+from pattern_cache import save_pattern
+from quote_csv import QuoteCsvWriter
+from rollups import QuoteReport, display_row
+import timing
+from timing import stage
+
+# Duct data for the current quote
+ducts = DuctTable()
+
+# Exact running totals of the quote per thickness, type and diameter band;
+# the CSV footer, the PDF and the totals labels all read these
+REPORT_GROUPINGS = ('thickness', 'type', 'diameter')
+report = QuoteReport(REPORT_GROUPINGS)
 
 # Track the currently selected duct type so users can change their
 # selection before submitting a duct.
 current_duct_type = None
 
+# What the quote CSV does after every entry: 'none', 'flush' or 'fsync'.
+CSV_SYNC = 'flush'
 
-def get_r(x, y, z):
-    return math.sqrt((0.5 * x - 0.5 * y) ** 2 + z ** 2)
+# Stock sheet sizes (width, length) used by the Nest Sheets button
+NEST_STOCK = ((48.0, 96.0), (60.0, 120.0))
 
+# Open the exported PDF in the browser
+OPEN_PDF = True
+quote_csv = None
 
-def get_p(x, y, z):
-    return x * (math.sqrt((0.5 * x - 0.5 * y) ** 2 + z ** 2)) / (y - z)
+# Quote database (see job_store.py) and the id of the open quote
+store = None
+quote_id = None
 
 
-def get_length(x, y, z):
-    return (2 * x) * math.sin(y / (2 * x)) + z * 2
+# --- DXF drawing helpers (geometry in flat_patterns.py) --------------------
 
+def draw_straight(width: float, length: float, filename: str) -> None:
+    """Create a DXF flat pattern for a straight duct."""
+    save_pattern(filename, add_straight, width, length)
 
-def get_arc(x, y, z):
-    return (2 * x) * math.sin(y / (2 * x)) + z * 2
 
+def draw_cone(filename: str, radius1: float, radius2: float, end_angle: float) -> None:
+    """Create a DXF flat pattern for a cone."""
+    save_pattern(filename, add_arcs_and_connect, radius1, radius2, end_angle)
 
-def get_sagitta(x, y):
-    return x - (math.sqrt(x ** 2 - (y / 2) ** 2))
 
+# ---------------------------------------------------------------------------
 
-def get_cone_bbox(inner_radius: float, outer_radius: float, angle_deg: float) -> tuple:
-    """Return width and height of the bounding box for a cone flat pattern."""
-    angles = [0, angle_deg]
-    for a in (90, 180, 270, 360):
-        if 0 < a < angle_deg:
-            angles.append(a)
-    xs, ys = [], []
-    for ang in angles:
-        rad = math.radians(ang)
-        for r in (inner_radius, outer_radius):
-            xs.append(r * math.cos(rad))
-            ys.append(r * math.sin(rad))
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(0, min(ys)), max(ys)
-    width = max_x - min_x
-    height = max_y - min_y
-    return width, height
+def tree_values(row):
+    """Format a row the same way it reads back from the CSV."""
+    return [str(value) for value in display_row(row)]
 
 
-# --- DXF drawing helpers (copied from ductCalc.py) -------------------------
+def show_new_duct(total_qty, total_sqft, total_weight):
+    """Add the newest duct to the data table and refresh the totals."""
+    with stage('refresh_ui'):
+        index = len(ducts) - 1
+        tree.insert("", tk.END, iid=str(index), values=tree_values(ducts.row(index)))
+        update_totals(total_qty, total_sqft, total_weight)
 
-def draw_straight(width: float, length: float, filename: str) -> None:
-    """Create a DXF flat pattern for a straight duct."""
-    doc = ezdxf.new()
-    doc.units = units.IN
-    doc.header['$INSUNITS'] = units.IN
-    doc.header['$MEASUREMENT'] = 0
-    msp = doc.modelspace()
 
-    msp.add_line((0, 0), (width, 0))
-    msp.add_line((width, 0), (width, length))
-    msp.add_line((width, length), (0, length))
-    msp.add_line((0, length), (0, 0))
-    doc.saveas(filename)
+def set_totals(total_qty, total_sqft, total_weight):
+    """Set the totals variables from the report, rounded for display."""
+    total = report.total
+    total_qty.set(total.qty)
+    total_sqft.set(round(total.sqft, 2))
+    total_weight.set(round(total.weight, 2))
 
 
-def draw_cone(filename: str, radius1: float, radius2: float, end_angle: float) -> None:
-    """Create a DXF flat pattern for a cone."""
-    doc = ezdxf.new()
-    doc.units = units.IN
-    doc.header['$INSUNITS'] = units.IN
-    doc.header['$MEASUREMENT'] = 0
-    msp = doc.modelspace()
+def update_totals(total_qty, total_sqft, total_weight):
+    """Refresh the totals labels under the data table."""
+    total_qty_label.config(text=f"Total QTY: {total_qty.get()}")
+    total_sqft_label.config(text=f"Total SQFT: {total_sqft.get()}")
+    total_weight_label.config(text=f"Total Weight: {total_weight.get()}")
+    rollup_label.config(text=rollup_text())
 
-    center = (0, 0)
-    start_angle = 0
 
-    msp.add_arc(center=center, radius=radius1, start_angle=start_angle, end_angle=end_angle)
-    msp.add_arc(center=center, radius=radius2, start_angle=start_angle, end_angle=end_angle)
+def rollup_text():
+    """Return the weight and SQFT per type and per thickness, one per line."""
+    lines = []
+    for grouping in ('type', 'thickness'):
+        for label, totals in report.groups(grouping):
+            lines.append(f"{label}: {totals.weight:.2f} lb, {totals.sqft:.2f} sqft")
+    return '\n'.join(lines)
 
-    x1_start = center[0] + radius1 * math.cos(math.radians(start_angle))
-    y1_start = center[1] + radius1 * math.sin(math.radians(start_angle))
-    x1_end = center[0] + radius1 * math.cos(math.radians(end_angle))
-    y1_end = center[1] + radius1 * math.sin(math.radians(end_angle))
 
-    x2_start = center[0] + radius2 * math.cos(math.radians(start_angle))
-    y2_start = center[1] + radius2 * math.sin(math.radians(start_angle))
-    x2_end = center[0] + radius2 * math.cos(math.radians(end_angle))
-    y2_end = center[1] + radius2 * math.sin(math.radians(end_angle))
+def csv_footer():
+    """Return the totals and per-group rows that end the CSV."""
+    return report.footer()
 
-    msp.add_line((x1_start, y1_start), (x2_start, y2_start))
-    msp.add_line((x1_end, y1_end), (x2_end, y2_end))
 
-    doc.saveas(filename)
+def csv_write(rows, footer):
+    """Append duct rows to the CSV and rewrite its totals footer, rounded."""
+    global quote_csv
+    if quote_csv is None:
+        quote_csv = QuoteCsvWriter(csv_filename, COLUMNS, sync=CSV_SYNC)
+    quote_csv.extend(map(display_row, rows), map(display_row, footer))
 
 
-# ---------------------------------------------------------------------------
+def save_duct(job, draw, draw_args, row, part, footer):
+    """Worker job: store a duct, draw its DXF and add its row to the CSV."""
+    with stage('persist_row'):
+        store.add_part(quote_id, row, part)
+    try:
+        if draw is not None:
+            draw(*draw_args)
+    finally:
+        # Keep the CSV complete even if the drawing fails
+        with stage('persist_row'):
+            csv_write([row], footer)
 
-def display_csv_content(total_qty, total_sqft, total_weight):
-    """Refresh the data table in the GUI."""
-    for row in tree.get_children():
-        tree.delete(row)
-    with open(csv_filename, "r") as file:
-        reader = csv.reader(file)
-        next(reader, None)  # header
-        for line in reader:
-            if line and line[0] != "Total:":
-                tree.insert("", tk.END, values=line)
-    total_qty_label.config(text=f"Total QTY: {total_qty.get()}")
-    total_sqft_label.config(text=f"Total SQFT: {total_sqft.get()}")
-    total_weight_label.config(text=f"Total Weight: {total_weight.get()}")
+
+def submit_duct(duct_name, draw=None, *draw_args):
+    """Save the newest duct's files on the worker thread."""
+    worker.submit(f"Save {duct_name}", save_duct, draw, draw_args,
+                  ducts.row(-1), ducts.parts[-1], csv_footer(), on_error=show_error)
+
+
+def show_error(exc):
+    messagebox.showerror("Duct Calculator", str(exc))
 
 
-def csv_write():
-    """Write the collected data to a CSV file."""
-    with open(csv_filename, 'w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([
-            'Name', 'Type', 'QTY', 'Thickness', 'Diameter',
-            'BBox Width', 'BBox Length', 'BBox Weight', 'BBox SQFT'])
-        writer.writerows(
-            zip(
-                duct_name_list, duct_type_list, duct_qty_list,
-                duct_thickness_list, duct_diameter, duct_bwidth_list,
-                duct_blength_list, duct_total_weight_list,
-                duct_total_sqft_list,
-            )
-        )
-        writer.writerow([
-            'Total:', sum(duct_qty_list), '', '', '', '',
-            sum(duct_total_weight_list), sum(duct_total_sqft_list)
-        ])
-        for t, w in sorted(weight_by_thickness.items()):
-            writer.writerow([f'Total Weight {t}', '', '', '', '', '', w, ''])
-        for t, s in sorted(sqft_by_thickness.items()):
-            writer.writerow([f'Total SQFT {t}', '', '', '', '', '', '', s])
+def show_status(done, submitted, text):
+    """Show the worker's progress under the data table."""
+    progress_bar.config(maximum=max(submitted, 1), value=done)
+    status_label.config(text=text if done < submitted else f"{text} (idle)")
+    if timing.enabled:
+        timing_label.config(text=timing.rolling_line())
 
 
 def export_pdf() -> None:
-    """Generate a PDF summary using the collected data."""
+    """Generate a PDF summary of the quote from the database."""
     pdf_name = csv_filename.replace('.csv', '.pdf')
-    headers = [
-        'Name', 'Type', 'QTY', 'Thickness', 'Diameter',
-        'BBox Width', 'BBox Length', 'BBox Weight', 'BBox SQFT'
-    ]
-    data = [headers]
-    for row in zip(
-        duct_name_list,
-        duct_type_list,
-        duct_qty_list,
-        duct_thickness_list,
-        duct_diameter,
-        duct_bwidth_list,
-        duct_blength_list,
-        duct_total_weight_list,
-        duct_total_sqft_list,
-    ):
-        data.append(list(row))
-    data.append([
-        'Total', sum(duct_qty_list), '', '', '', '', '',
-        sum(duct_total_weight_list), sum(duct_total_sqft_list)
-    ])
-    doc = SimpleDocTemplate(pdf_name, pagesize=letter)
-    table = Table(data, repeatRows=1)
-    style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-    ])
-    table.setStyle(style)
-
-    summary_data = [['Thickness', 'Total Weight', 'Total SQFT']]
-    all_thicknesses = set(weight_by_thickness) | set(sqft_by_thickness)
-    for t in sorted(all_thicknesses):
-        summary_data.append([
-            str(t),
-            round(weight_by_thickness.get(t, 0), 2),
-            round(sqft_by_thickness.get(t, 0), 2),
-        ])
-    summary_table = Table(summary_data, hAlign='LEFT')
-    summary_style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-    ])
-    summary_table.setStyle(summary_style)
-
-    doc.build([table, Spacer(1, 12), summary_table])
-    webbrowser.open_new(pdf_name)
+    worker.submit("Export PDF", build_pdf, pdf_name, report.copy(),
+                  on_done=webbrowser.open_new if OPEN_PDF else None,
+                  on_error=show_error, cancellable=True)
+
+
+def build_pdf(job, pdf_name, totals):
+    """Worker job: write the quote PDF and return its filename."""
+
+    def on_page(page):
+        job.check()
+        job.report(f"Export PDF: page {page}")
+
+    try:
+        store.export_pdf(quote_id, pdf_name, progress=on_page, report=totals)
+    except Cancelled:
+        if os.path.exists(pdf_name):
+            os.remove(pdf_name)
+        raise
+    return pdf_name
+
+
+def nest_sheets() -> None:
+    """Nest the quote's parts onto stock sheets and show the sheet counts."""
+    # Rows reopened from before parts were stored have nothing to draw
+    lines = [line for line in zip(ducts.parts, ducts.column('qty').tolist(),
+                                  ducts.column('thickness').tolist())
+             if line[0] is not None]
+    worker.submit("Nest sheets", build_nest, lines,
+                  csv_filename.replace('.csv', '_sheet'),
+                  on_done=show_nest, on_error=show_error, cancellable=True)
+
+
+def build_nest(job, lines, prefix):
+    """Worker job: nest the parts and write one DXF per sheet."""
+    nest = nest_parts(lines, NEST_STOCK)
+    job.check()
+    write_sheet_dxfs(nest, prefix)
+    return nest
+
+
+def show_nest(nest):
+    nest_label.config(text='\n'.join(
+        f"{t}: {result.sheet_count} sheets, {result.utilisation:.0%} used"
+        + (f", {len(result.oversize)} oversize" if result.oversize else '')
+        for t, result in nest.items()))
+
+
+def export_zip() -> None:
+    """Write every part DXF of the quote into one ZIP next to the CSV."""
+    zip_name = csv_filename.replace('.csv', '.zip')
+    parts = [part for part in ducts.parts if part is not None]
+    worker.submit("Export DXF ZIP", build_zip, parts, zip_name,
+                  on_error=show_error, cancellable=True)
+
+
+def build_zip(job, parts, zip_name):
+    """Worker job: draw the parts into ``zip_name`` and return its filename."""
+    from dxf_jobs import write_dxf_zip  # loads ezdxf
+
+    for result in write_dxf_zip(parts, zip_name, workers=1):
+        job.check()
+        if result.index % 100 == 99:
+            job.report(f"Export DXF ZIP: {result.index + 1} of {len(parts)}")
+    return zip_name
+
+
+def close_window():
+    """Finish the queued saves before closing the window."""
+    worker.close()
+    if quote_csv is not None:
+        quote_csv.close()
+    if store is not None:
+        store.close()
+    root.destroy()
 
 
 # ---------------------------------------------------------------------------
@@ -238,37 +247,26 @@ def duct_name_and_type():
 
             thickness = float(thickness_entry.get())
             diameter = float(diameter_entry.get())
-            circumference = diameter * math.pi
             length = float(length_entry.get())
             qty = float(qty_entry.get())
-            steel_density = 0.2836
-            weight = ((circumference * length * thickness) * steel_density) * qty
-            sqft = ((circumference * length) / 144) * qty
-
-            duct_qty_list.append(qty)
-            duct_thickness_list.append(round(thickness, 2))
-            duct_bwidth_list.append(round(circumference, 2))
-            duct_blength_list.append(round(length, 2))
-            duct_total_sqft_list.append(round(sqft, 2))
-            duct_total_weight_list.append(round(weight, 2))
-            duct_diameter.append(diameter)
-            weight_by_thickness[round(thickness, 2)] = weight_by_thickness.get(round(thickness, 2), 0) + round(weight, 2)
-            sqft_by_thickness[round(thickness, 2)] = sqft_by_thickness.get(round(thickness, 2), 0) + round(sqft, 2)
-
-            total_qty.set(sum(duct_qty_list))
-            total_sqft.set(sum(duct_total_sqft_list))
-            total_weight.set(sum(duct_total_weight_list))
+            with stage('compute'):
+                circumference, weight, sqft = straight_duct(thickness, diameter, length, qty)
 
             duct_name = duct_name_entry.get()
-            duct_name_list.append(duct_name)
-            duct_type_list.append(current_duct_type)
-            draw_straight(circumference, length, f"{duct_name}.dxf")
+            ducts.append(
+                duct_name, current_duct_type, qty, thickness,
+                diameter, circumference, length, weight, sqft,
+                part=DxfPart('straight', duct_name, (circumference, length)))
+            report.add(current_duct_type, qty, thickness, diameter, weight, sqft)
+
+            set_totals(total_qty, total_sqft, total_weight)
+
+            submit_duct(duct_name, draw_straight, circumference, length, f"{duct_name}.dxf")
 
             for w in duct_widgets:
                 w.destroy()
             duct_name_entry.delete(0, 'end')
-            csv_write()
-            display_csv_content(total_qty, total_sqft, total_weight)
+            show_new_duct(total_qty, total_sqft, total_weight)
 
         global duct_widgets
         duct_widgets = []
@@ -311,46 +309,29 @@ def duct_name_and_type():
             total_weight = tk.DoubleVar()
 
             qty = float(qty_entry.get())
-            steel_weight = 0.2836
             s_dia = float(small_diameter_entry.get())
             l_dia = float(large_diameter_entry.get())
             height = float(length_entry.get())
             thickness = float(thickness_entry.get())
-            r = get_r(l_dia, s_dia, height)  # Slant height
-            p = get_p(height, l_dia, s_dia)  # Flat pattern inside radius
-            q = r + p  # Flat pattern outside radius (large diameter)
-            l_inner_arc = math.pi * s_dia  # Length of inner arc
-            a = l_inner_arc / p
-            d = (a * 180) / math.pi
-            b_width, b_length = get_cone_bbox(p, q, d)
-            b_sqft = (b_width * b_length) / 144
-            b_volume = b_width * b_length * thickness
-            b_weight = b_volume * steel_weight
-
-            duct_qty_list.append(qty)
-            duct_thickness_list.append(round(thickness, 2))
-            duct_bwidth_list.append(round(b_width, 2))
-            duct_blength_list.append(round(b_length, 2))
-            duct_total_sqft_list.append(round(b_sqft, 2))
-            duct_total_weight_list.append(round(b_weight, 2))
-            duct_diameter.append(round(s_dia, 2))
-            weight_by_thickness[round(thickness, 2)] = weight_by_thickness.get(round(thickness, 2), 0) + round(b_weight, 2)
-            sqft_by_thickness[round(thickness, 2)] = sqft_by_thickness.get(round(thickness, 2), 0) + round(b_sqft, 2)
-
-            total_qty.set(sum(duct_qty_list))
-            total_sqft.set(sum(duct_total_sqft_list))
-            total_weight.set(sum(duct_total_weight_list))
+            with stage('compute'):
+                p, q, d, b_width, b_length, b_weight, b_sqft = reducing_cone(
+                    thickness, s_dia, l_dia, height)
 
             duct_name = duct_name_entry.get()
-            duct_name_list.append(duct_name)
-            duct_type_list.append(current_duct_type)
-            draw_cone(f"{duct_name}.dxf", p, q, d)
+            ducts.append(
+                duct_name, current_duct_type, qty, thickness,
+                s_dia, b_width, b_length, b_weight, b_sqft,
+                part=DxfPart('cone', duct_name, (p, q, d)))
+            report.add(current_duct_type, qty, thickness, s_dia, b_weight, b_sqft)
+
+            set_totals(total_qty, total_sqft, total_weight)
+
+            submit_duct(duct_name, draw_cone, f"{duct_name}.dxf", p, q, d)
 
             for w in duct_widgets:
                 w.destroy()
             duct_name_entry.delete(0, 'end')
-            csv_write()
-            display_csv_content(total_qty, total_sqft, total_weight)
+            show_new_duct(total_qty, total_sqft, total_weight)
 
         global duct_widgets
         duct_widgets = []
@@ -405,37 +386,26 @@ def duct_name_and_type():
             qty = float(qty_entry.get())
             thickness = float(thickness_entry.get())
             diameter = float(diameter_entry.get())
-            steel_weight = 0.2836
             clr = float(clr_entry.get())
             degree = float(degree_entry.get())
-            blength = clr * 2
-            bwidth = diameter * math.pi
-            sqft = ((((blength * bwidth) / 144) * degree) / 90) * qty
-            weight = (sqft * 144 * thickness * steel_weight)
-
-            duct_qty_list.append(qty)
-            duct_thickness_list.append(round(thickness, 2))
-            duct_bwidth_list.append(round(bwidth, 2))
-            duct_blength_list.append(round(blength, 2))
-            duct_total_sqft_list.append(round(sqft, 2))
-            duct_total_weight_list.append(round(weight, 2))
-            duct_diameter.append(round(diameter, 2))
-            weight_by_thickness[round(thickness, 2)] = weight_by_thickness.get(round(thickness, 2), 0) + round(weight, 2)
-            sqft_by_thickness[round(thickness, 2)] = sqft_by_thickness.get(round(thickness, 2), 0) + round(sqft, 2)
-
-            total_qty.set(sum(duct_qty_list))
-            total_sqft.set(sum(duct_total_sqft_list))
-            total_weight.set(sum(duct_total_weight_list))
+            with stage('compute'):
+                bwidth, blength, weight, sqft = gored_elbow(thickness, diameter, clr, degree, qty)
 
             duct_name = duct_name_entry.get()
-            duct_name_list.append(duct_name)
-            duct_type_list.append(current_duct_type)
+            ducts.append(
+                duct_name, current_duct_type, qty, thickness,
+                diameter, bwidth, blength, weight, sqft,
+                part=DxfPart('elbow', duct_name, (diameter, clr, degree)))
+            report.add(current_duct_type, qty, thickness, diameter, weight, sqft)
+
+            set_totals(total_qty, total_sqft, total_weight)
+
+            submit_duct(duct_name, draw_gored_elbow, f"{duct_name}.dxf", diameter, clr, degree)
 
             for w in duct_widgets:
                 w.destroy()
             duct_name_entry.delete(0, 'end')
-            csv_write()
-            display_csv_content(total_qty, total_sqft, total_weight)
+            show_new_duct(total_qty, total_sqft, total_weight)
 
         thickness_label = ttk.Label(root, text='Thickness: ')
         thickness_label.grid(row=6, column=0, pady=2, padx=5, sticky='NWES')
@@ -501,12 +471,30 @@ def duct_name_and_type():
 
 def overview_info():
     """Grab overview information and show duct entry form."""
-    global customer, quote, csv_filename
+    global customer, quote, csv_filename, ducts, report, store, quote_id
     customer = customer_name_entry.get()
     quote = quote_number_entry.get()
     project = project_name_entry.get()
     csv_filename = f"{customer}_{quote}.csv"
 
+    # Reopen the quote if it is already in the database
+    store = default_store()
+    quote_id = store.open_quote(customer, quote, project)
+    ducts = store.load_table(quote_id)
+    # The rows are stored unrounded, so the reopened quote's totals are the
+    # same exact sums as when it was entered
+    report = QuoteReport(REPORT_GROUPINGS)
+    report.add_rows(ducts.iter_rows())
+    for index, row in enumerate(ducts.rows()):
+        tree.insert("", tk.END, iid=str(index), values=tree_values(row))
+    total = report.total
+    total_qty_label.config(text=f"Total QTY: {total.qty}")
+    total_sqft_label.config(text=f"Total SQFT: {round(total.sqft, 2)}")
+    total_weight_label.config(text=f"Total Weight: {round(total.weight, 2)}")
+    rollup_label.config(text=rollup_text())
+    worker.submit("Open quote", lambda job, rows, footer: csv_write(rows, footer),
+                  ducts.rows(), csv_footer(), on_error=show_error)
+
     ttk.Label(root, text=customer).grid(row=1, column=1, pady=2, padx=5, sticky='NWES')
     ttk.Label(root, text=quote).grid(row=2, column=1, pady=2, padx=5, sticky='NWES')
     ttk.Label(root, text=project).grid(row=3, column=1, pady=2, padx=5, sticky='NWES')
@@ -520,46 +508,79 @@ def overview_info():
 
 
 # --- main window -----------------------------------------------------------
-root = tk.Tk()
-root.geometry('960x540')
-root.title("Duct Calculator")
-
-customer_name = ttk.Label(root, text='Customer Name: ')
-customer_name.grid(row=1, column=0, pady=2, padx=5, sticky='NWES')
-customer_name_entry = ttk.Entry(root)
-customer_name_entry.grid(row=1, column=1, pady=2, padx=5, sticky='NWES')
-
-quote_number = ttk.Label(root, text='Quote Number: ')
-quote_number.grid(row=2, column=0, pady=2, padx=5, sticky='NWES')
-quote_number_entry = ttk.Entry(root)
-quote_number_entry.grid(row=2, column=1, pady=2, padx=5, sticky='NWES')
-
-project_name = ttk.Label(root, text='Project Name: ')
-project_name.grid(row=3, column=0, pady=2, padx=5, sticky='NWES')
-project_name_entry = ttk.Entry(root)
-project_name_entry.grid(row=3, column=1, pady=2, padx=5, sticky='NWES')
-
-overview_info_button = ttk.Button(root, text='Enter', command=overview_info)
-overview_info_button.grid(row=4, column=1, pady=2, padx=5, sticky='NWES')
-
-tree_columns = [
-    'Name', 'Type', 'QTY', 'Thickness', 'Diameter',
-    'BBox Width', 'BBox Length', 'BBox Weight', 'BBox SQFT'
-]
-tree = ttk.Treeview(root, columns=tree_columns, show='headings', height=30)
-for col in tree_columns:
-    tree.heading(col, text=col)
-    tree.column(col, anchor='center')
-tree.grid(row=1, rowspan=30, column=3, columnspan=2, padx=5, pady=5, sticky='NWES')
-
-total_qty_label = ttk.Label(root, text='Total QTY: 0')
-total_qty_label.grid(row=31, column=3, sticky='w', padx=5)
-total_sqft_label = ttk.Label(root, text='Total SQFT: 0')
-total_sqft_label.grid(row=32, column=3, sticky='w', padx=5)
-total_weight_label = ttk.Label(root, text='Total Weight: 0')
-total_weight_label.grid(row=33, column=3, sticky='w', padx=5)
-
-export_pdf_button = ttk.Button(root, text='Export PDF', command=export_pdf)
-export_pdf_button.grid(row=34, column=3, pady=5, padx=5, sticky='w')
-
-root.mainloop()
+
+def main():
+    """Build the main window and run the Tk main loop."""
+    global root, tree, worker, overview_info_button
+    global customer_name_entry, quote_number_entry, project_name_entry
+    global total_qty_label, total_sqft_label, total_weight_label, rollup_label
+    global nest_label, progress_bar, status_label, timing_label
+    root = tk.Tk()
+    root.geometry('960x540')
+    root.title("Duct Calculator")
+
+    customer_name = ttk.Label(root, text='Customer Name: ')
+    customer_name.grid(row=1, column=0, pady=2, padx=5, sticky='NWES')
+    customer_name_entry = ttk.Entry(root)
+    customer_name_entry.grid(row=1, column=1, pady=2, padx=5, sticky='NWES')
+
+    quote_number = ttk.Label(root, text='Quote Number: ')
+    quote_number.grid(row=2, column=0, pady=2, padx=5, sticky='NWES')
+    quote_number_entry = ttk.Entry(root)
+    quote_number_entry.grid(row=2, column=1, pady=2, padx=5, sticky='NWES')
+
+    project_name = ttk.Label(root, text='Project Name: ')
+    project_name.grid(row=3, column=0, pady=2, padx=5, sticky='NWES')
+    project_name_entry = ttk.Entry(root)
+    project_name_entry.grid(row=3, column=1, pady=2, padx=5, sticky='NWES')
+
+    overview_info_button = ttk.Button(root, text='Enter', command=overview_info)
+    overview_info_button.grid(row=4, column=1, pady=2, padx=5, sticky='NWES')
+
+    tree_columns = [
+        'Name', 'Type', 'QTY', 'Thickness', 'Diameter',
+        'BBox Width', 'BBox Length', 'BBox Weight', 'BBox SQFT'
+    ]
+    tree = ttk.Treeview(root, columns=tree_columns, show='headings', height=30)
+    for col in tree_columns:
+        tree.heading(col, text=col)
+        tree.column(col, anchor='center')
+    tree.grid(row=1, rowspan=30, column=3, columnspan=2, padx=5, pady=5, sticky='NWES')
+
+    total_qty_label = ttk.Label(root, text='Total QTY: 0')
+    total_qty_label.grid(row=31, column=3, sticky='w', padx=5)
+    total_sqft_label = ttk.Label(root, text='Total SQFT: 0')
+    total_sqft_label.grid(row=32, column=3, sticky='w', padx=5)
+    total_weight_label = ttk.Label(root, text='Total Weight: 0')
+    total_weight_label.grid(row=33, column=3, sticky='w', padx=5)
+    rollup_label = ttk.Label(root, text='', justify='left')
+    rollup_label.grid(row=31, column=4, rowspan=3, sticky='nw', padx=5)
+
+    export_pdf_button = ttk.Button(root, text='Export PDF', command=export_pdf)
+    export_pdf_button.grid(row=34, column=3, pady=5, padx=5, sticky='w')
+
+    nest_button = ttk.Button(root, text='Nest Sheets', command=nest_sheets)
+    nest_button.grid(row=35, column=3, pady=5, padx=5, sticky='w')
+    zip_button = ttk.Button(root, text='Export DXF ZIP', command=export_zip)
+    zip_button.grid(row=35, column=4, pady=5, padx=5, sticky='w')
+    nest_label = ttk.Label(root, text='')
+    nest_label.grid(row=36, column=3, sticky='w', padx=5)
+
+    # Files are written on a background thread; see gui_worker.py
+    progress_bar = ttk.Progressbar(root, mode='determinate')
+    progress_bar.grid(row=37, column=3, pady=2, padx=5, sticky='we')
+    status_label = ttk.Label(root, text='')
+    status_label.grid(row=38, column=3, sticky='w', padx=5)
+    cancel_button = ttk.Button(root, text='Cancel Export', command=lambda: worker.cancel())
+    cancel_button.grid(row=34, column=4, pady=5, padx=5, sticky='w')
+    # Rolling per-stage timings, with DUCTCALC_TIMING=1 (see timing.py)
+    timing_label = ttk.Label(root, text='')
+    timing_label.grid(row=39, column=3, columnspan=2, sticky='w', padx=5)
+    worker = Worker(root, on_status=show_status)
+    root.protocol("WM_DELETE_WINDOW", close_window)
+
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
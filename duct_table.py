@@ -0,0 +1,90 @@
+"""Columnar storage for the ducts entered into a quote.
+
+:class:`DuctTable` replaces the parallel per-column lists used by
+``duct_gui``. Numeric columns live in one growable NumPy array, the name and
+type strings are interned. The table holds no totals; feed its rows or
+columns to ``rollups.QuoteReport``, which does all the summing.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+
+COLUMNS = (
+    'Name', 'Type', 'QTY', 'Thickness', 'Diameter',
+    'BBox Width', 'BBox Length', 'BBox Weight', 'BBox SQFT',
+)
+
+# Numeric columns in the order they follow the name and type in a row.
+NUMERIC_COLUMNS = ('qty', 'thickness', 'diameter', 'bwidth', 'blength', 'weight', 'sqft')
+_COLUMN_INDEX = {name: i for i, name in enumerate(NUMERIC_COLUMNS)}
+
+
+class DuctTable:
+    """Rows of duct data, with each numeric column available as an array."""
+
+    def __init__(self, capacity: int = 256) -> None:
+        self._data = np.zeros((len(NUMERIC_COLUMNS), max(1, capacity)))
+        self._names: List[str] = []
+        self._types: List[str] = []
+        self.parts: List[Any] = []
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def append(self, name: str, duct_type: str, qty: float, thickness: float,
+               diameter: float, bwidth: float, blength: float,
+               weight: float, sqft: float, part: Any = None) -> int:
+        """Add a duct and return its row index.
+
+        ``part`` is an optional flat-pattern description (a
+        ``duct_core.DxfPart``) kept alongside the row, e.g. for nesting.
+        """
+        index = len(self._names)
+        if index == self._data.shape[1]:
+            grown = np.zeros((self._data.shape[0], index * 2))
+            grown[:, :index] = self._data
+            self._data = grown
+        self._data[:, index] = (qty, thickness, diameter, bwidth, blength, weight, sqft)
+        self._names.append(sys.intern(name))
+        self._types.append(sys.intern(duct_type))
+        self.parts.append(part)
+        return index
+
+    def row(self, index: int) -> list:
+        """Return one row as ``[name, type, qty, ..., sqft]``."""
+        if index < 0:
+            index += len(self._names)
+        return [self._names[index], self._types[index], *self._data[:, index].tolist()]
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> List[list]:
+        """Return the rows in ``start:stop`` as lists of plain Python values."""
+        start, stop, _ = slice(start, stop).indices(len(self._names))
+        numeric = self._data[:, start:stop].T.tolist()
+        return [
+            [name, duct_type, *values]
+            for name, duct_type, values in zip(
+                self._names[start:stop], self._types[start:stop], numeric)
+        ]
+
+    def iter_rows(self, chunk: int = 1024) -> Iterator[list]:
+        """Yield the current rows, converting ``chunk`` rows at a time.
+
+        Rows appended after the call are not included.
+        """
+        stop = len(self._names)
+
+        def generate():
+            for start in range(0, stop, chunk):
+                yield from self.rows(start, min(start + chunk, stop))
+
+        return generate()
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a read-only view of a numeric column, e.g. ``'weight'``."""
+        view = self._data[_COLUMN_INDEX[name], :len(self._names)]
+        view.flags.writeable = False
+        return view
@@ -0,0 +1,201 @@
+"""Content-addressed on-disk cache of part DXFs shared across quotes.
+
+Standard fittings get drawn for quote after quote.
+:func:`pattern_cache.save_pattern` looks every part up here by a hash of its
+type, dimensions and :data:`GENERATOR_VERSION`; on a hit the cached file is
+copied (or hard linked) to ``{duct_name}.dxf`` instead of drawing it again.
+
+The cache lives in ``~/.cache/ductcalc/dxf`` unless ``DUCTCALC_DXF_CACHE``
+points elsewhere (``off`` disables it). ``DUCTCALC_DXF_CACHE_MAX_MB`` caps
+its size, least recently used files are evicted first, and
+``DUCTCALC_DXF_CACHE_LINK=1`` hard links files instead of copying them.
+Hard linked outputs share their data with the cache, so don't edit them in
+place.
+
+Inspect or trim the cache with::
+
+    python dxf_cache.py stats
+    python dxf_cache.py prune --max-mb 100
+    python dxf_cache.py clear
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+
+# Bump whenever the drawing code changes what a part's DXF looks like, so
+# stale cache entries are no longer found.
+GENERATOR_VERSION = 1
+
+# Check the cache size after this many new entries
+_PRUNE_EVERY = 256
+
+
+def unshare(filename: str) -> None:
+    """Remove ``filename`` if it is a hard link, e.g. into the cache.
+
+    Call this before overwriting an output file so the new content doesn't
+    end up in the cache entry the old file was linked to.
+    """
+    try:
+        if os.stat(filename).st_nlink > 1:
+            os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+class DiskCache:
+    """Directory of DXF files named by the hash of the part geometry."""
+
+    def __init__(self, directory: str, max_bytes: int, link: bool = False) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+
+    def path_for(self, key: tuple) -> str:
+        import ezdxf  # only once a part is actually drawn
+
+        digest = hashlib.sha256(
+            repr((GENERATOR_VERSION, ezdxf.__version__, key)).encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + '.dxf')
+
+    def _output(self, path: str, filename: str) -> None:
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        if self.link:
+            try:
+                if os.path.lexists(filename):
+                    os.remove(filename)
+                os.link(path, filename)
+                return
+            except OSError:
+                pass  # e.g. another file system, fall back to copying
+        unshare(filename)
+        shutil.copyfile(path, filename)
+
+    def fetch(self, key: tuple, filename: str) -> bool:
+        """Write the cached DXF for ``key`` to ``filename`` if there is one."""
+        path = self.path_for(key)
+        try:
+            self._output(path, filename)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        os.utime(path)  # mark as recently used for eviction
+        self.hits += 1
+        return True
+
+    def store(self, key: tuple, text: str, encoding: str) -> str:
+        """Add a DXF to the cache and return its path."""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see half a file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with open(fd, 'wt', encoding=encoding, errors='dxfreplace') as fp:
+            fp.write(text)
+        os.replace(tmp, path)
+        self._stores += 1
+        if self._stores % _PRUNE_EVERY == 0:
+            self.prune()
+        return path
+
+    def _files(self) -> list:
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.dxf'):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:  # evicted by another process
+                        continue
+                    files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """Evict least recently used files until the cache fits ``max_bytes``.
+
+        Other processes may be adding, using or pruning entries meanwhile:
+        files that are already gone are skipped, and so are files stored or
+        used after the prune started.
+        """
+        start = time.time()
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            if total <= limit:
+                break
+            if mtime > start:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            else:
+                removed += 1
+            total -= size
+        return removed
+
+    def clear(self) -> int:
+        return self.prune(0)
+
+    def stats(self) -> dict:
+        """Return the cache size and this process's hit and miss counts.
+
+        The counts only cover lookups made by this process; parts drawn in
+        ``-j`` worker processes count in the workers.
+        """
+        files = self._files()
+        return {
+            'directory': self.directory, 'files': len(files),
+            'bytes': sum(size for _, size, _ in files), 'max_bytes': self.max_bytes,
+            'process_hits': self.hits, 'process_misses': self.misses,
+        }
+
+
+def _default_cache() -> Optional[DiskCache]:
+    directory = os.environ.get(
+        'DUCTCALC_DXF_CACHE',
+        os.path.join(os.path.expanduser('~'), '.cache', 'ductcalc', 'dxf'))
+    if directory.lower() in ('', 'off', '0', 'none'):
+        return None
+    max_mb = float(os.environ.get('DUCTCALC_DXF_CACHE_MAX_MB', '512'))
+    link = os.environ.get('DUCTCALC_DXF_CACHE_LINK') == '1'
+    return DiskCache(directory, int(max_mb * 2 ** 20), link)
+
+
+disk_cache = _default_cache()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the shared DXF cache")
+    parser.add_argument("command", choices=("stats", "prune", "clear"))
+    parser.add_argument("--max-mb", type=float, help="Size to prune down to")
+    args = parser.parse_args()
+    if disk_cache is None:
+        print("DXF cache is disabled (DUCTCALC_DXF_CACHE=off)")
+        return
+    if args.command == "stats":
+        for name, value in disk_cache.stats().items():
+            if not name.startswith('process_'):  # always 0 in a fresh process
+                print(f"{name}: {value}")
+    elif args.command == "prune":
+        max_bytes = None if args.max_mb is None else int(args.max_mb * 2 ** 20)
+        print(f"Removed {disk_cache.prune(max_bytes)} files")
+    else:
+        print(f"Removed {disk_cache.clear()} files")
+
+
+if __name__ == "__main__":
+    main()
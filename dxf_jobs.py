@@ -0,0 +1,283 @@
+"""Generate the DXF flat patterns for a whole job in one call.
+
+Each part is described by a :class:`DxfPart` holding the part kind
+(``'straight'``, ``'cone'`` or ``'elbow'``), its name and the positional
+arguments of the matching drawing function. :func:`generate_dxfs` draws the
+parts either serially on the calling thread or fanned out over a
+``ProcessPoolExecutor`` and reports one :class:`PartResult` per part, in the
+same order as the input. :func:`write_dxf_zip` does the same but streams the
+DXFs into one ZIP archive instead of a file per part.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import re
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+import ezdxf
+
+from duct_core import DxfPart
+from flat_patterns import (add_arcs_and_connect, add_straight, draw_arcs_and_connect,
+                           draw_straight)
+from gored_flat_pattern import add_gored_elbow_blocks, draw_gored_elbow
+from pattern_cache import pattern_text
+from timing import stage
+
+
+class PartResult(NamedTuple):
+    """Outcome of drawing one part; ``error`` is ``None`` on success."""
+
+    index: int
+    name: str
+    filename: str
+    error: Optional[str]
+
+
+def _draw_straight(filename: str, width: float, length: float,
+                   writer: Optional[str] = None) -> None:
+    draw_straight(width, length, filename, writer=writer)
+
+
+DRAWERS = {
+    'straight': _draw_straight,
+    'cone': draw_arcs_and_connect,
+    'elbow': draw_gored_elbow,
+}
+
+# Functions adding a part's entities to any layout (modelspace or block)
+ADDERS = {
+    'straight': add_straight,
+    'cone': add_arcs_and_connect,
+    'elbow': add_gored_elbow_blocks,
+}
+
+
+def part_filename(part: DxfPart, out_dir: str = '.') -> str:
+    return os.path.join(out_dir, f"{part.name}.dxf")
+
+
+def draw_part(part: DxfPart, filename: str, writer: Optional[str] = None) -> None:
+    """Draw a single part with the drawing function for its kind."""
+    try:
+        drawer = DRAWERS[part.kind]
+    except KeyError:
+        raise ValueError(f"unknown part kind {part.kind!r}") from None
+    drawer(filename, *part.params, writer=writer)
+
+
+def add_part(layout, part: DxfPart) -> None:
+    """Add a part's flat pattern to ``layout``, e.g. a block definition."""
+    try:
+        adder = ADDERS[part.kind]
+    except KeyError:
+        raise ValueError(f"unknown part kind {part.kind!r}") from None
+    adder(layout, *part.params)
+
+
+def part_text(part: DxfPart, writer: Optional[str] = None) -> tuple:
+    """Return ``(dxf_text, encoding)`` of a part without writing a file."""
+    try:
+        adder = ADDERS[part.kind]
+    except KeyError:
+        raise ValueError(f"unknown part kind {part.kind!r}") from None
+    return pattern_text(adder, *part.params, writer=writer)
+
+
+def _draw_task(task: tuple) -> PartResult:
+    index, part, filename, writer = task
+    try:
+        draw_part(part, filename, writer)
+    except Exception as exc:  # reported per part, the job carries on
+        return PartResult(index, part.name, filename, f"{type(exc).__name__}: {exc}")
+    return PartResult(index, part.name, filename, None)
+
+
+def _draw_chunk(chunk: list) -> list:
+    return [_draw_task(task) for task in chunk]
+
+
+def _init_worker(deterministic: bool) -> None:
+    ezdxf.options.write_fixed_meta_data_for_testing = deterministic
+
+
+def generate_dxfs(parts: Iterable[DxfPart],
+                  out_dir: str = '.',
+                  workers: Optional[int] = None,
+                  chunksize: int = 32,
+                  deterministic: bool = False,
+                  executor: Optional[Executor] = None,
+                  writer: Optional[str] = None) -> Iterator[PartResult]:
+    """Draw every part of a job and yield a :class:`PartResult` per part.
+
+    Parameters
+    ----------
+    parts : iterable of DxfPart
+        Parts to draw, written to ``{out_dir}/{name}.dxf``.
+    out_dir : str, optional
+        Directory for the DXF files.
+    workers : int, optional
+        Number of worker processes, defaults to the CPU count. ``1`` draws
+        serially on the calling thread.
+    chunksize : int, optional
+        Number of parts submitted to a worker per task.
+    deterministic : bool, optional
+        Write fixed timestamps and GUIDs so the same part always produces the
+        same bytes, whichever path or worker drew it.
+    executor : concurrent.futures.Executor, optional
+        Existing process pool to draw on instead of starting one, e.g. a
+        long-running server's. ``workers`` then only sets how many chunks are
+        kept in flight, and ``deterministic`` is up to the pool's initializer.
+    writer : str, optional
+        DXF writer, ``'ezdxf'`` or ``'lite'``; see ``pattern_cache.save_pattern``.
+
+    Results are yielded in input order. A part that fails to draw is reported
+    with its error message instead of aborting the job.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = ((i, part, part_filename(part, out_dir), writer) for i, part in enumerate(parts))
+
+    if executor is None and workers == 1:
+        saved = ezdxf.options.write_fixed_meta_data_for_testing
+        _init_worker(deterministic)
+        try:
+            for task in tasks:
+                yield _draw_task(task)
+        finally:
+            ezdxf.options.write_fixed_meta_data_for_testing = saved
+        return
+
+    if executor is not None:
+        yield from _pooled(executor, _draw_chunk, tasks, chunksize, workers * 4)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(deterministic,)) as pool:
+        yield from _pooled(pool, _draw_chunk, tasks, chunksize, workers * 4)
+
+
+def _pooled(pool: Executor, run_chunk, tasks: Iterator[tuple], chunksize: int,
+            max_pending: int) -> Iterator:
+    # Keep a bounded number of chunks in flight so huge jobs don't queue
+    # every part up front, and collect them in submission order.
+    pending = deque()
+    while True:
+        chunk = list(islice(tasks, chunksize))
+        if not chunk:
+            break
+        pending.append(pool.submit(run_chunk, chunk))
+        if len(pending) >= max_pending:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+# --- ZIP archives ------------------------------------------------------------
+
+MANIFEST = 'manifest.csv'
+# zlib level for the entries; DXF text shrinks ~10x even at the fastest level
+ZIP_LEVEL = 1
+MANIFEST_HEADER = ('name', 'entry', 'error')
+
+
+def safe_name(name: str, seen: set) -> str:
+    """Return a file-name safe version of ``name`` not yet in ``seen``.
+
+    Characters other than letters, digits, ``-``, ``_`` and ``.`` become
+    ``_``, and a name already in ``seen`` (ignoring case) gets ``_2``,
+    ``_3``, ... appended, so parts with the same name don't overwrite each
+    other. The result is added to ``seen``.
+    """
+    base = re.sub(r'[^\w.-]+', '_', name).strip('._') or 'part'
+    name, n = base, 1
+    while name.lower() in seen:
+        n += 1
+        name = f"{base}_{n}"
+    seen.add(name.lower())
+    return name
+
+
+def safe_names(names: Iterable[str]) -> List[str]:
+    """Return :func:`safe_name` of each of ``names``, all unique."""
+    seen = set()
+    return [safe_name(name, seen) for name in names]
+
+
+def _text_task(task: tuple) -> tuple:
+    index, part, entry, writer = task
+    try:
+        text, encoding = part_text(part, writer)
+        data = text.encode(encoding, errors='dxfreplace')
+    except Exception as exc:  # reported per part, the job carries on
+        return PartResult(index, part.name, entry, f"{type(exc).__name__}: {exc}"), None
+    return PartResult(index, part.name, entry, None), data
+
+
+def _text_chunk(chunk: list) -> list:
+    return [_text_task(task) for task in chunk]
+
+
+def write_dxf_zip(parts: Iterable[DxfPart],
+                  filename: str,
+                  workers: Optional[int] = None,
+                  chunksize: int = 32,
+                  writer: Optional[str] = None,
+                  executor: Optional[Executor] = None) -> Iterator[PartResult]:
+    """Draw every part of a job into one ZIP archive of DXFs.
+
+    The parts are drawn to memory (over ``workers`` processes, as in
+    :func:`generate_dxfs`) and appended to the archive in input order, so
+    the share sees one sequential write instead of a file create and close
+    per part. Entries are named after the parts with :func:`safe_names`, and
+    a ``manifest.csv`` entry maps each part name to its entry. The archive
+    is written to ``filename + '.part'`` and renamed when complete.
+
+    Like :func:`generate_dxfs` this is a generator yielding a
+    :class:`PartResult` per part, whose ``filename`` is the entry name;
+    nothing is written until it is iterated.
+    """
+    workers = workers or os.cpu_count() or 1
+    seen = set()
+    tasks = ((i, part, safe_name(part.name, seen) + '.dxf', writer)
+             for i, part in enumerate(parts))
+    if executor is None and workers == 1:
+        drawn = map(_text_task, tasks)
+        yield from _write_zip(drawn, filename)
+        return
+    if executor is not None:
+        yield from _write_zip(_pooled(executor, _text_chunk, tasks, chunksize, workers * 4),
+                              filename)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from _write_zip(_pooled(pool, _text_chunk, tasks, chunksize, workers * 4),
+                              filename)
+
+
+def _write_zip(drawn: Iterator[tuple], filename: str) -> Iterator[PartResult]:
+    partial = filename + '.part'
+    # The manifest is only complete at the end; spool it to disk if it grows
+    with tempfile.SpooledTemporaryFile(max_size=1 << 20, mode='w+', newline='') as manifest:
+        rows = csv.writer(manifest)
+        rows.writerow(MANIFEST_HEADER)
+        try:
+            with open(partial, 'wb', buffering=1 << 20) as fp, \
+                    zipfile.ZipFile(fp, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_LEVEL) as zf:
+                for result, data in drawn:
+                    if data is not None:
+                        with stage('save_dxf'):
+                            zf.writestr(result.filename, data)
+                    rows.writerow((result.name, '' if result.error else result.filename,
+                                   result.error or ''))
+                    yield result
+                manifest.seek(0)
+                zf.writestr(MANIFEST, manifest.read())
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+    os.replace(partial, filename)
@@ -0,0 +1,197 @@
+"""Minimal DXF writer for the simple flat patterns.
+
+Our parts are a handful of entities: four LINEs for a straight, two ARCs and
+two LINEs for a cone, one closed polyline for a gored elbow. Building and
+exporting an ezdxf document for each of them costs far more than the
+geometry. :class:`EntityLayout` stands in for an ezdxf layout (``add_line``,
+``add_arc``, ``add_lwpolyline``, ``add_blockref`` and ``doc.blocks``), so
+the existing ``add_*`` drawing functions draw into it unchanged, and
+:func:`write_dxf` streams the result as a minimal DXF R12 file: a HEADER
+with the same inch-units variables as ``dxf_template.new_part_document``,
+the BLOCKS if any, the ENTITIES and nothing else.
+
+R12 is the one DXF version that needs no tables, handles or objects, and
+every CAD/CAM program reads it. It has no LWPOLYLINE, so polylines are
+written as the equivalent closed 2D ``POLYLINE`` with ``VERTEX`` entities.
+
+``tests/test_dxf_lite.py`` reads the output back with ezdxf and compares
+its geometry with ezdxf's own drawing. Run this module to time both
+writers::
+
+    python dxf_lite.py --parts 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import time
+from typing import Callable, Optional, TextIO
+
+# The drawings only contain ASCII; this is the R12 default code page
+ENCODING = 'cp1252'
+
+_HEADER = (
+    "  0\nSECTION\n  2\nHEADER\n"
+    "  9\n$ACADVER\n  1\nAC1009\n"
+    "  9\n$DWGCODEPAGE\n  3\nANSI_1252\n"
+    "  9\n$INSUNITS\n 70\n1\n"      # inches
+    "  9\n$MEASUREMENT\n 70\n0\n"   # imperial
+    "  0\nENDSEC\n"
+)
+_ENTITIES = "  0\nSECTION\n  2\nENTITIES\n"
+_FOOTER = "  0\nENDSEC\n  0\nEOF\n"
+
+
+class BlockSection:
+    """Block definitions of a lite drawing, like ``doc.blocks`` in ezdxf."""
+
+    def __init__(self, doc: LiteDocument) -> None:
+        self.doc = doc
+        self._blocks = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._blocks
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def new(self, name: str) -> EntityLayout:
+        if name in self._blocks:
+            raise ValueError(f"block {name!r} already exists")
+        block = self._blocks[name] = EntityLayout(self.doc)
+        return block
+
+    def text(self) -> str:
+        if not self._blocks:
+            return ''
+        chunks = ["  0\nSECTION\n  2\nBLOCKS\n"]
+        for name, block in self._blocks.items():
+            chunks.append(f"  0\nBLOCK\n  8\n0\n  2\n{name}\n 70\n0\n"
+                          f" 10\n0.0\n 20\n0.0\n 30\n0.0\n  3\n{name}\n")
+            chunks.append(block.entities())
+            chunks.append("  0\nENDBLK\n  8\n0\n")
+        chunks.append("  0\nENDSEC\n")
+        return ''.join(chunks)
+
+
+class LiteDocument:
+    """The document an :class:`EntityLayout` belongs to; holds the blocks."""
+
+    def __init__(self) -> None:
+        self.blocks = BlockSection(self)
+
+
+class EntityLayout:
+    """Collects entities through the subset of the ezdxf layout API we use.
+
+    Only the default layer and plain 2D geometry are supported;
+    ``dxfattribs`` other than ``layer`` are ignored.
+    """
+
+    def __init__(self, doc: Optional[LiteDocument] = None) -> None:
+        self.doc = doc if doc is not None else LiteDocument()
+        self._chunks = []
+
+    @staticmethod
+    def _layer(dxfattribs) -> str:
+        return (dxfattribs or {}).get('layer', '0')
+
+    def add_line(self, start, end, dxfattribs=None) -> None:
+        self._chunks.append(
+            f"  0\nLINE\n  8\n{self._layer(dxfattribs)}\n"
+            f" 10\n{float(start[0])!r}\n 20\n{float(start[1])!r}\n 30\n0.0\n"
+            f" 11\n{float(end[0])!r}\n 21\n{float(end[1])!r}\n 31\n0.0\n")
+
+    def add_arc(self, center, radius, start_angle, end_angle, is_counter_clockwise=True,
+                dxfattribs=None) -> None:
+        if not is_counter_clockwise:
+            start_angle, end_angle = end_angle, start_angle
+        self._chunks.append(
+            f"  0\nARC\n  8\n{self._layer(dxfattribs)}\n"
+            f" 10\n{float(center[0])!r}\n 20\n{float(center[1])!r}\n 30\n0.0\n"
+            f" 40\n{float(radius)!r}\n"
+            f" 50\n{float(start_angle)!r}\n 51\n{float(end_angle)!r}\n")
+
+    def add_lwpolyline(self, points, format='xy', close=False, dxfattribs=None) -> None:
+        layer = self._layer(dxfattribs)
+        vertex = f"  0\nVERTEX\n  8\n{layer}\n 10\n%r\n 20\n%r\n 30\n0.0\n"
+        if hasattr(points, 'tolist'):
+            points = points.tolist()
+        chunks = [f"  0\nPOLYLINE\n  8\n{layer}\n 66\n1\n 10\n0.0\n 20\n0.0\n 30\n0.0\n"
+                  f" 70\n{1 if close else 0}\n"]
+        chunks.extend(vertex % (float(p[0]), float(p[1])) for p in points)
+        chunks.append(f"  0\nSEQEND\n  8\n{layer}\n")
+        self._chunks.append(''.join(chunks))
+
+    def add_blockref(self, name: str, insert, dxfattribs=None) -> None:
+        if name not in self.doc.blocks:
+            raise ValueError(f"undefined block {name!r}")
+        self._chunks.append(
+            f"  0\nINSERT\n  8\n{self._layer(dxfattribs)}\n  2\n{name}\n"
+            f" 10\n{float(insert[0])!r}\n 20\n{float(insert[1])!r}\n 30\n0.0\n")
+
+    def entities(self) -> str:
+        return ''.join(self._chunks)
+
+
+def write_dxf(stream: TextIO, add: Callable, *params) -> None:
+    """Draw ``add(layout, *params)`` and write it to a text stream as DXF."""
+    layout = EntityLayout()
+    add(layout, *params)
+    stream.write(_HEADER)
+    stream.write(layout.doc.blocks.text())
+    stream.write(_ENTITIES)
+    stream.write(layout.entities())
+    stream.write(_FOOTER)
+
+
+def dxf_text(add: Callable, *params) -> str:
+    """Return the DXF of ``add(layout, *params)`` as a string."""
+    stream = io.StringIO()
+    write_dxf(stream, add, *params)
+    return stream.getvalue()
+
+
+def benchmark(parts: int = 500) -> dict:
+    """Time writing ``parts`` straights, cones and elbows with both writers.
+
+    Returns the mean milliseconds per part, keyed ``(kind, writer)``.
+    """
+    from flat_patterns import add_arcs_and_connect, add_straight
+    from dxf_template import part_document
+    from gored_flat_pattern import add_gored_elbow_blocks
+
+    def ezdxf_text(add, params):
+        doc = part_document()
+        add(doc.modelspace(), *params)
+        doc.write(io.StringIO())
+
+    cases = {
+        'straight': (add_straight, lambda i: (30.0 + i * 0.01, 60.0)),
+        'cone': (add_arcs_and_connect, lambda i: (20.0 + i * 0.01, 30.0, 71.4)),
+        'elbow': (add_gored_elbow_blocks, lambda i: (12.0 + i * 0.01, 18.0, 90.0)),
+    }
+    results = {}
+    for kind, (add, params) in cases.items():
+        for writer, build in (('ezdxf', lambda p: ezdxf_text(add, p)),
+                              ('lite', lambda p: dxf_text(add, *p))):
+            start = time.perf_counter()
+            for i in range(parts):
+                build(params(i))
+            results[kind, writer] = (time.perf_counter() - start) * 1000 / parts
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the lite DXF writer against ezdxf")
+    parser.add_argument("--parts", type=int, default=500, help="Number of parts per kind")
+    args = parser.parse_args()
+    results = benchmark(args.parts)
+    for kind in ('straight', 'cone', 'elbow'):
+        ez, lite = results[kind, 'ezdxf'], results[kind, 'lite']
+        print(f"{kind:>9}: ezdxf {ez:.3f} ms/part, lite {lite:.3f} ms/part ({ez / lite:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
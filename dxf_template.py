@@ -0,0 +1,110 @@
+"""Reusable, pre-configured DXF document for writing single parts.
+
+Creating a document with ``ezdxf.new()`` builds all tables, styles,
+linetypes and layouts, which is most of the cost of writing a part that only
+has a handful of entities. :func:`part_document` instead hands out one
+template document per thread, already set to inch units, with the
+previous part's entities and blocks removed. The handle counter is reset as
+well, so a part produces the same file whichever parts were drawn before it.
+
+Run this module to compare the per-part cost of both approaches::
+
+    python dxf_template.py --parts 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import threading
+import time
+
+import ezdxf
+from ezdxf import units
+from ezdxf.document import Drawing
+
+_local = threading.local()
+
+
+def new_part_document() -> Drawing:
+    """Return a fresh document set up for inch flat patterns."""
+    doc = ezdxf.new()
+    doc.units = units.IN
+    doc.header['$INSUNITS'] = units.IN
+    doc.header['$MEASUREMENT'] = 0
+    return doc
+
+
+def _template() -> Drawing:
+    doc = getattr(_local, 'doc', None)
+    if doc is None:
+        doc = new_part_document()
+        # The first export adds the metadata objects every saved file
+        # carries; do it once up front so the handle seed below stays valid.
+        doc.write(io.StringIO())
+        _local.doc = doc
+        _local.handle_seed = str(doc.entitydb.handles)
+        _local.block_names = {block.name for block in doc.blocks}
+    return doc
+
+
+def part_document() -> Drawing:
+    """Return this thread's template document with an empty modelspace.
+
+    Draw the part into ``doc.modelspace()`` and save it before asking for
+    the next document; the previous part, and any blocks it defined, are
+    cleared out here.
+    """
+    doc = _template()
+    doc.modelspace().delete_all_entities()
+    for block in list(doc.blocks):
+        if block.name not in _local.block_names:
+            doc.blocks.delete_block(block.name, safe=False)
+    doc.entitydb.purge()
+    doc.entitydb.handles.reset(_local.handle_seed)
+    return doc
+
+
+def _add_straight(doc: Drawing, width: float, length: float) -> None:
+    msp = doc.modelspace()
+    msp.add_line((0, 0), (width, 0))
+    msp.add_line((width, 0), (width, length))
+    msp.add_line((width, length), (0, length))
+    msp.add_line((0, length), (0, 0))
+
+
+def benchmark(parts: int = 500) -> dict:
+    """Time building and exporting ``parts`` straight ducts in memory.
+
+    Returns the mean milliseconds per part for ``ezdxf.new()`` per part and
+    for the shared template. Files are written to memory so the numbers are
+    not dominated by the file system.
+    """
+    results = {}
+    start = time.perf_counter()
+    for i in range(parts):
+        doc = new_part_document()
+        _add_straight(doc, 10 + i, 60)
+        doc.write(io.StringIO())
+    results['new'] = (time.perf_counter() - start) * 1000 / parts
+
+    start = time.perf_counter()
+    for i in range(parts):
+        doc = part_document()
+        _add_straight(doc, 10 + i, 60)
+        doc.write(io.StringIO())
+    results['template'] = (time.perf_counter() - start) * 1000 / parts
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark per-part DXF creation")
+    parser.add_argument("--parts", type=int, default=500, help="Number of parts to write")
+    args = parser.parse_args()
+    results = benchmark(args.parts)
+    for name, ms in results.items():
+        print(f"{name:>9}: {ms:.3f} ms/part")
+
+
+if __name__ == "__main__":
+    main()
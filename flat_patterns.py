@@ -0,0 +1,60 @@
+"""Flat patterns of straight ducts and reducing cones.
+
+``add_*`` draw a part into any ezdxf-style layout (a modelspace, a block or
+a ``dxf_lite`` layout) and ``draw_*`` save it as a DXF through
+``pattern_cache.save_pattern``. Gored elbows are in ``gored_flat_pattern``.
+Nothing here imports ezdxf, so the GUI and the command line start quickly.
+"""
+
+import math
+
+from pattern_cache import save_pattern
+
+
+def add_straight(msp, width, length):
+    start = (0,0)
+    msp.add_line((start), (width, 0))
+    msp.add_line((width, 0), (width, length))
+    msp.add_line((width, length), (0, length))
+    msp.add_line((0, length), (start))
+
+
+def draw_straight(width, length, filename, writer=None):
+    save_pattern(filename, add_straight, width, length, writer=writer)
+
+
+def add_arcs_and_connect(msp, radius1, radius2, end_angle):
+    # Define the center of the arcs
+    center = (0, 0)
+
+    # Define the start and end angles of the arcs
+    start_angle = 0
+
+    # Draw the first arc
+    msp.add_arc(center=center, radius=radius1, start_angle=start_angle, end_angle=end_angle)
+
+    # Calculate the start and endpoint of the first arc
+    x1_start = center[0] + radius1 * math.cos(math.radians(start_angle))
+    y1_start = center[1] + radius1 * math.sin(math.radians(start_angle))
+    x1_end = center[0] + radius1 * math.cos(math.radians(end_angle))
+    y1_end = center[1] + radius1 * math.sin(math.radians(end_angle))
+
+    # Draw the second arc
+    msp.add_arc(center=center, radius=radius2, start_angle=start_angle, end_angle=end_angle)
+
+    # Calculate the start and endpoint of the second arc
+    x2_start = center[0] + radius2 * math.cos(math.radians(start_angle))
+    y2_start = center[1] + radius2 * math.sin(math.radians(start_angle))
+    x2_end = center[0] + radius2 * math.cos(math.radians(end_angle))
+    y2_end = center[1] + radius2 * math.sin(math.radians(end_angle))
+
+    # Connect the starting points of the arcs with lines
+    msp.add_line((x1_start, y1_start), (x2_start, y2_start))  # Connect the starting points of the arcs
+
+    # Connect the endpoints of the arcs with lines
+    msp.add_line((x1_end, y1_end), (x2_end, y2_end))  # Connect the endpoints of the arcs
+
+
+def draw_arcs_and_connect(filename, radius1, radius2, end_angle, writer=None):
+    # Create and save the DXF drawing, reusing it if this cone was drawn before
+    save_pattern(filename, add_arcs_and_connect, radius1, radius2, end_angle, writer=writer)
@@ -3,16 +3,234 @@
 This module generates DXF files using ezdxf. The pattern consists of a
 sinusoidal wave representing the seam between gores. Two half waves are
 used at the ends to represent the half gores typically used in a gored
-elbow.
+elbow. The outline points are computed with NumPy, for one elbow or a
+whole batch of elbows at once, by :func:`gored_elbow_polylines`.
+
+Only two gore shapes occur in an elbow, the end half gore and the full gore,
+and the seams of neighbouring gores meet on the centre line. DXFs are
+therefore drawn by :func:`add_gored_elbow_blocks`: each shape is computed
+once, stored as a block and inserted once per gore, so the file size and the
+work no longer grow with ``num_gores * points_per_gore``.
 """
 
 from __future__ import annotations
 
 import argparse
 import math
+import weakref
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from pattern_cache import save_pattern
+
+
+def gored_elbow_polylines(diameter,
+                          clr,
+                          angle_deg,
+                          num_gores=5,
+                          points_per_gore=40) -> List[np.ndarray]:
+    """Compute the closed flat-pattern outlines of one or more gored elbows.
+
+    All parameters take scalars or equal-length arrays (one value per elbow)
+    and have the same meaning as in :func:`draw_gored_elbow`. The points of
+    every elbow are computed in one vectorized pass into a single contiguous
+    buffer.
+
+    Returns
+    -------
+    list of numpy.ndarray
+        One ``(N, 2)`` array per elbow: the outer seam followed by the inner
+        seam in reverse, ready for ``add_lwpolyline(..., close=True)``.
+    """
+    diameter, clr, angle_deg, num_gores, points_per_gore = (
+        np.atleast_1d(a) for a in np.broadcast_arrays(
+            diameter, clr, angle_deg, num_gores, points_per_gore)
+    )
+    num_gores = num_gores.astype(int)
+    points_per_gore = points_per_gore.astype(int)
+    if np.any(num_gores < 2):
+        raise ValueError("num_gores must be at least 2")
+
+    # Per elbow: flat width, bounding length, gore lengths and wave amplitude
+    width = diameter * math.pi
+    total_length = 2.0 * clr * (angle_deg / 90.0)
+    full_gore_length = total_length / (num_gores - 1)
+    half_gore_length = full_gore_length / 2.0
+    amplitude = diameter / 4.0
+    half_steps = np.maximum(2, (points_per_gore * 0.5).astype(int))
+    full_steps = np.maximum(2, points_per_gore)
+
+    # Per gore segment: a half gore at each end, full gores in between
+    elbow_of_seg = np.repeat(np.arange(len(num_gores)), num_gores)
+    seg_start = np.cumsum(num_gores) - num_gores
+    seg_idx = np.arange(len(elbow_of_seg)) - seg_start[elbow_of_seg]
+    is_end = (seg_idx == 0) | (seg_idx == num_gores[elbow_of_seg] - 1)
+    seg_length = np.where(is_end, half_gore_length[elbow_of_seg],
+                          full_gore_length[elbow_of_seg])
+    seg_steps = np.where(is_end, half_steps[elbow_of_seg], full_steps[elbow_of_seg])
+    seg_x = np.where(seg_idx == 0, 0.0,
+                     half_gore_length[elbow_of_seg]
+                     + (seg_idx - 1) * full_gore_length[elbow_of_seg])
+    seg_wave = np.where(is_end, math.pi, 2.0 * math.pi)
+
+    # Per point along the outer/inner seams
+    seg_of_pt = np.repeat(np.arange(len(seg_steps)), seg_steps)
+    pt_start = np.cumsum(seg_steps) - seg_steps
+    i = np.arange(len(seg_of_pt)) - pt_start[seg_of_pt]
+    t = i / (seg_steps[seg_of_pt] - 1)
+    elbow_of_pt = elbow_of_seg[seg_of_pt]
+    offset = amplitude[elbow_of_pt] * np.sin(seg_wave[seg_of_pt] * t)
+    x = seg_x[seg_of_pt] + t * seg_length[seg_of_pt]
+    mid = width[elbow_of_pt] / 2.0
 
-import ezdxf
-from ezdxf import units
+    # Each elbow's block of the buffer holds its outer seam followed by
+    # the inner seam reversed
+    elbow_points = np.bincount(elbow_of_pt, minlength=len(num_gores))
+    elbow_start = np.cumsum(elbow_points) - elbow_points
+    local = np.arange(len(elbow_of_pt)) - elbow_start[elbow_of_pt]
+    base = 2 * elbow_start[elbow_of_pt]
+    outer_at = base + local
+    inner_at = base + 2 * elbow_points[elbow_of_pt] - 1 - local
+
+    points = np.empty((2 * len(elbow_of_pt), 2))
+    points[outer_at, 0] = x
+    points[outer_at, 1] = mid + offset
+    points[inner_at, 0] = x
+    points[inner_at, 1] = mid - offset
+    return np.split(points, 2 * np.cumsum(elbow_points)[:-1])
+
+
+def gore_outlines(diameter: float,
+                  clr: float,
+                  angle_deg: float,
+                  num_gores: int = 5,
+                  points_per_gore: int = 40) -> Tuple[np.ndarray, np.ndarray, List[float]]:
+    """Compute the two distinct gore shapes of an elbow and where they go.
+
+    Returns ``(half_gore, full_gore, offsets)``: the closed outlines of the
+    end half gore and of a full gore, both starting at x = 0, and the x
+    offset of every gore along the pattern. Placed at their offsets, the
+    gores trace the same outline as :func:`gored_elbow_polylines`.
+    """
+    if num_gores < 2:
+        raise ValueError("num_gores must be at least 2")
+    width = diameter * math.pi
+    total_length = 2.0 * clr * (angle_deg / 90.0)
+    full_gore_length = total_length / (num_gores - 1)
+    half_gore_length = full_gore_length / 2.0
+    amplitude = diameter / 4.0
+    mid = width / 2.0
+
+    def outline(length, steps, wave):
+        t = np.linspace(0.0, 1.0, steps)
+        offset = amplitude * np.sin(wave * t)
+        top = np.column_stack((t * length, mid + offset))
+        bottom = np.column_stack((t * length, mid - offset))
+        # Both seams meet on the centre line at the ends; don't repeat them
+        return np.concatenate((top, bottom[-2:0:-1]))
+
+    half_gore = outline(half_gore_length, max(2, int(points_per_gore * 0.5)), math.pi)
+    full_gore = outline(full_gore_length, max(2, int(points_per_gore)), 2.0 * math.pi)
+    offsets = [0.0] + [half_gore_length + i * full_gore_length for i in range(num_gores - 1)]
+    return half_gore, full_gore, offsets
+
+
+def outline_area(points: np.ndarray) -> float:
+    """Return the area enclosed by a gore outline from :func:`gore_outlines`.
+
+    A full gore's seams cross on the centre line halfway along, so the
+    outline is a figure of eight whose signed (shoelace) area cancels out.
+    The area is summed per segment between the seams instead, splitting the
+    segment where the seams cross.
+    """
+    steps = (len(points) + 2) // 2
+    top = points[:steps]
+    bottom = np.concatenate((top[:1], points[steps:][::-1], top[-1:]))
+    gap = top[:, 1] - bottom[:, 1]
+    d0, d1, h = gap[:-1], gap[1:], np.diff(top[:, 0])
+    trapezoid = np.abs(d0 + d1) / 2.0
+    # Where the seams cross inside a segment it encloses two triangles
+    crossing = d0 * d1 < 0
+    spread = np.where(crossing, np.abs(d0) + np.abs(d1), 1.0)
+    triangles = (d0 ** 2 + d1 ** 2) / (2.0 * spread)
+    return float(np.sum(np.where(crossing, triangles, trapezoid) * h))
+
+
+def gored_elbow_area(diameter: float,
+                     clr: float,
+                     angle_deg: float,
+                     num_gores: int = 5,
+                     points_per_gore: int = 40) -> float:
+    """Return the material area of a gored elbow's drawn flat pattern."""
+    half_gore, full_gore, offsets = gore_outlines(diameter, clr, angle_deg, num_gores,
+                                                  points_per_gore)
+    return 2.0 * outline_area(half_gore) + (len(offsets) - 2) * outline_area(full_gore)
+
+
+# Exact (rounded) outline of every gore block drawn into a document
+_block_shapes = weakref.WeakKeyDictionary()
+
+
+def _gore_block(layout, kind: str, points: np.ndarray) -> str:
+    # Blocks are named after their geometry, so elbows sharing a gore shape
+    # in one document (e.g. a job DXF) share the block too. The name is a
+    # short checksum (R12 names are at most 31 characters), so a block is
+    # only reused if its outline is exactly the same; a different outline
+    # under the same name gets a numbered name of its own.
+    shape = (np.round(points, 6) + 0.0).tobytes()
+    base = f"GORE_{kind}_{zlib.crc32(shape):08X}_{len(points)}"
+    blocks = layout.doc.blocks
+    shapes = _block_shapes.setdefault(layout.doc, {})
+    name, n = base, 1
+    while name in blocks:
+        if shapes.get(name) == shape:
+            return name
+        n += 1
+        name = f"{base}_{n}"
+    blocks.new(name).add_lwpolyline(points, close=True)
+    shapes[name] = shape
+    return name
+
+
+def add_gored_elbow_blocks(layout,
+                           diameter: float,
+                           clr: float,
+                           angle_deg: float,
+                           num_gores: int = 5,
+                           points_per_gore: int = 40) -> None:
+    """Add the gored elbow flat pattern to ``layout`` as one insert per gore.
+
+    The half gore and full gore outlines are block definitions in the
+    layout's document; see :func:`draw_gored_elbow` for the parameters.
+    """
+    half_gore, full_gore, offsets = gore_outlines(diameter, clr, angle_deg, num_gores,
+                                                  points_per_gore)
+    half = _gore_block(layout, 'HALF', half_gore)
+    full = _gore_block(layout, 'FULL', full_gore) if num_gores > 2 else None
+    for i, x in enumerate(offsets):
+        layout.add_blockref(half if i in (0, len(offsets) - 1) else full, (x, 0))
+
+
+def add_gored_elbow(layout,
+                    diameter: float,
+                    clr: float,
+                    angle_deg: float,
+                    num_gores: int = 5,
+                    points_per_gore: int = 40) -> None:
+    """Add the gored elbow flat pattern to ``layout`` as one closed polyline.
+
+    ``layout`` can be a modelspace or a block; see :func:`draw_gored_elbow`
+    for the parameters. :func:`add_gored_elbow_blocks` draws the same
+    outline far more compactly.
+    """
+    if num_gores < 2:
+        raise ValueError("num_gores must be at least 2")
+
+    points = gored_elbow_polylines(diameter, clr, angle_deg, num_gores,
+                                   points_per_gore)[0]
+    layout.add_lwpolyline(points, close=True)
 
 
 def draw_gored_elbow(filename: str,
@@ -20,7 +238,8 @@ def draw_gored_elbow(filename: str,
                      clr: float,
                      angle_deg: float,
                      num_gores: int = 5,
-                     points_per_gore: int = 40) -> None:
+                     points_per_gore: int = 40,
+                     writer: Optional[str] = None) -> None:
     """Draw a sinusoidal flat pattern for a gored elbow.
 
     Parameters
@@ -38,49 +257,11 @@ def draw_gored_elbow(filename: str,
     points_per_gore : int, optional
         Number of interpolation points per full gore segment of the
         sinusoidal curve.
+    writer : str, optional
+        DXF writer, ``'ezdxf'`` or ``'lite'``; see ``pattern_cache.save_pattern``.
     """
-    if num_gores < 2:
-        raise ValueError("num_gores must be at least 2")
-
-    doc = ezdxf.new()
-    doc.units = units.IN
-    doc.header['$INSUNITS'] = units.IN
-    doc.header['$MEASUREMENT'] = 0
-    msp = doc.modelspace()
-
-    # Flat width of the pattern (circumference)
-    width = diameter * math.pi
-    # Approximate bounding length used in existing GUI logic
-    total_length = 2.0 * clr * (angle_deg / 90.0)
-
-    # Length of one full gore along the centerline
-    full_gore_length = total_length / (num_gores - 1)
-    half_gore_length = full_gore_length / 2.0
-
-    # Simple amplitude heuristic for the sinusoidal edge
-    amplitude = diameter / 4.0
-
-    lengths = [half_gore_length] + [full_gore_length] * (num_gores - 2) + [half_gore_length]
-
-    outer = []
-    inner = []
-    x = 0.0
-    for idx, gl in enumerate(lengths):
-        steps = max(2, int(points_per_gore * (gl / full_gore_length)))
-        for i in range(steps):
-            t = i / (steps - 1)
-            if idx in (0, num_gores - 1):
-                wave_angle = math.pi * t
-            else:
-                wave_angle = 2.0 * math.pi * t
-            offset = amplitude * math.sin(wave_angle)
-            outer.append((x + t * gl, width / 2.0 + offset))
-            inner.append((x + t * gl, width / 2.0 - offset))
-        x += gl
-
-    polyline_points = outer + inner[::-1]
-    msp.add_lwpolyline(polyline_points, close=True)
-    doc.saveas(filename)
+    save_pattern(filename, add_gored_elbow_blocks, diameter, clr, angle_deg,
+                 num_gores, points_per_gore, writer=writer)
 
 
 def main() -> None:
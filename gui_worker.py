@@ -0,0 +1,179 @@
+"""Run slow GUI work on a background thread.
+
+Saving DXFs, appending to the quote CSV and building PDFs used to run inside
+the Tk callbacks, freezing the window until the file was written (seconds on
+a shared drive). :class:`Worker` runs such jobs one at a time on a single
+thread, so files are still written in the order the ducts were entered, and
+hands progress and results back to the Tk main loop by polling with
+``root.after``; Tk widgets are only ever touched from the main thread.
+
+Job functions are called as ``func(job, *args)``. Long jobs call
+``job.check()`` now and then so they can be cancelled, and ``job.report()``
+to show how far they got.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+import timing
+
+# How often the main loop looks for finished jobs while the worker is busy
+POLL_MS = 50
+
+
+class Cancelled(Exception):
+    """Raised by :meth:`Job.check` once a job has been cancelled."""
+
+
+class Job:
+    """One unit of work submitted to a :class:`Worker`."""
+
+    def __init__(self, worker: Worker, name: str, func: Callable, args: tuple,
+                 on_done: Optional[Callable], on_error: Optional[Callable],
+                 cancellable: bool) -> None:
+        self.name = name
+        self.func = func
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancellable = cancellable
+        self._worker = worker
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def check(self) -> None:
+        """Raise :class:`Cancelled` if the job was cancelled."""
+        if self._cancel.is_set():
+            raise Cancelled(self.name)
+
+    def report(self, text: str) -> None:
+        """Show ``text`` as the job's progress (safe from the worker thread)."""
+        self._worker._events.put(('progress', self, text))
+
+
+class Worker:
+    """A single background thread running :class:`Job` s in order.
+
+    Parameters
+    ----------
+    root : tkinter.Misc
+        Widget whose ``after`` is used to poll for results.
+    on_status : callable, optional
+        Called on the main thread as ``on_status(done, submitted, text)``
+        whenever a job starts, reports progress or finishes.
+    """
+
+    def __init__(self, root, on_status: Optional[Callable] = None) -> None:
+        self.root = root
+        self.on_status = on_status
+        self.submitted = 0
+        self.done = 0
+        self._jobs: queue.Queue = queue.Queue()
+        self._events: queue.Queue = queue.Queue()
+        self._pending = []  # cancellable jobs not finished yet
+        self._polling = False
+        self._thread = threading.Thread(target=self._run, name='gui-worker', daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        return self.done < self.submitted
+
+    def submit(self, name: str, func: Callable, *args: Any,
+               on_done: Optional[Callable] = None,
+               on_error: Optional[Callable] = None,
+               cancellable: bool = False) -> Job:
+        """Queue ``func(job, *args)``.
+
+        ``on_done(result)`` or ``on_error(exc)`` is called on the main thread
+        when the job finishes. A cancelled job calls neither.
+        """
+        job = Job(self, name, func, args, on_done, on_error, cancellable)
+        self.submitted += 1
+        if cancellable:
+            self._pending.append(job)
+        self._jobs.put(job)
+        self._status(name)
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll)
+        return job
+
+    def cancel(self) -> int:
+        """Cancel the running and queued cancellable jobs, return how many."""
+        for job in self._pending:
+            job.cancel()
+        return len(self._pending)
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the thread, after the queued jobs if ``wait`` is true."""
+        self._jobs.put(None)
+        if wait:
+            self._thread.join()
+            self._poll()
+
+    def _run(self) -> None:
+        profiler = timing.profile_thread()
+        try:
+            self._run_jobs()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+
+    def _run_jobs(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            if job.cancelled:
+                self._events.put(('cancelled', job, None))
+                continue
+            self._events.put(('progress', job, job.name))
+            try:
+                result = job.func(job, *job.args)
+            except Cancelled:
+                self._events.put(('cancelled', job, None))
+            except Exception as exc:
+                self._events.put(('error', job, exc))
+            else:
+                self._events.put(('done', job, result))
+
+    def _status(self, text: str) -> None:
+        if self.on_status is not None:
+            self.on_status(self.done, self.submitted, text)
+
+    def _poll(self) -> None:
+        while True:
+            try:
+                kind, job, value = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                self._status(value)
+                continue
+            self.done += 1
+            if job in self._pending:
+                self._pending.remove(job)
+            if kind == 'done':
+                self._status(f"{job.name}: done")
+                if job.on_done is not None:
+                    job.on_done(value)
+            elif kind == 'error':
+                self._status(f"{job.name}: failed")
+                if job.on_error is not None:
+                    job.on_error(value)
+            else:
+                self._status(f"{job.name}: cancelled")
+        if self.busy:
+            self.root.after(POLL_MS, self._poll)
+        else:
+            self._polling = False
@@ -0,0 +1,82 @@
+"""Write a whole job into one DXF file.
+
+Instead of one ``{name}.dxf`` per part, :func:`write_job_dxf` defines every
+distinct flat pattern once as a block and places one ``INSERT`` per piece
+(``qty`` inserts per job line) on a layer named after the part. The inserts
+are laid out row by row so the parts don't overlap.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from typing import Iterable, Optional, Tuple
+
+from ezdxf import bbox
+
+from dxf_jobs import DxfPart, add_part
+from dxf_template import new_part_document
+
+# Characters AutoCAD does not allow in layer names
+_INVALID_LAYER_CHARS = re.compile(r'[<>/\\":;?*|=`]')
+
+
+def layer_name(name: str) -> str:
+    """Return a valid layer name for a part name."""
+    return _INVALID_LAYER_CHARS.sub('_', name).strip() or '0'
+
+
+def write_job_dxf(lines: Iterable[Tuple[DxfPart, float]],
+                  filename: str,
+                  columns: Optional[int] = None,
+                  spacing: float = 2.0) -> int:
+    """Write every part of a job into a single DXF of block inserts.
+
+    Parameters
+    ----------
+    lines : iterable of (DxfPart, qty)
+        Job lines; each gets ``round(qty)`` inserts.
+    filename : str
+        Output DXF filename.
+    columns : int, optional
+        Inserts per row of the layout, defaults to a roughly square grid.
+    spacing : float, optional
+        Gap between neighbouring parts.
+
+    Returns the number of inserts placed.
+    """
+    doc = new_part_document()
+    msp = doc.modelspace()
+
+    blocks = {}   # (kind, params) -> (block name, extents)
+    inserts = []  # (block name, extents, layer)
+    for part, qty in lines:
+        key = (part.kind, tuple(part.params))
+        if key not in blocks:
+            block = doc.blocks.new(f"{part.kind.upper()}_{len(blocks) + 1}")
+            add_part(block, part)
+            blocks[key] = (block.name, bbox.extents(block))
+        layer = layer_name(part.name)
+        if layer not in doc.layers:
+            doc.layers.add(layer)
+        block_name, extents = blocks[key]
+        inserts.extend([(block_name, extents, layer)] * int(round(qty)))
+
+    if columns is None:
+        columns = max(1, math.ceil(math.sqrt(len(inserts))))
+
+    # Fill rows left to right; each row is as tall as its tallest part.
+    x = y = row_height = 0.0
+    for i, (block_name, extents, layer) in enumerate(inserts):
+        if i and i % columns == 0:
+            x = 0.0
+            y += row_height + spacing
+            row_height = 0.0
+        # Shift each part so its bounding box starts at the cell corner
+        msp.add_blockref(block_name, (x - extents.extmin.x, y - extents.extmin.y),
+                         dxfattribs={'layer': layer})
+        x += extents.size.x + spacing
+        row_height = max(row_height, extents.size.y)
+
+    doc.saveas(filename)
+    return len(inserts)
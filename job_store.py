@@ -0,0 +1,335 @@
+"""SQLite store for quotes and their parts.
+
+The quote CSV written by ``duct_gui`` is a view of the quote, not a
+database: it can't be reopened or queried across quotes. :class:`JobStore`
+keeps every quote and part in one SQLite file in WAL mode, so appending a
+part is a small crash-safe transaction, and questions like "how much 0.0598
+did last month's quotes use" are a single indexed query. The quote CSV and
+PDF can be regenerated from the store at any time.
+
+The database lives in ``~/.local/share/ductcalc/jobs.db`` unless
+``DUCTCALC_DB`` points elsewhere. Keep it on a local disk; SQLite's WAL mode
+does not work over network file systems.
+
+Query it from the command line with::
+
+    python job_store.py list
+    python job_store.py export CUSTOMER QUOTE --csv quote.csv --pdf quote.pdf
+    python job_store.py usage --since 2026-09-01
+    python job_store.py usage --since 2026-09-01 --by customer
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from duct_table import COLUMNS, DuctTable
+from duct_core import DxfPart
+from rollups import QuoteReport, display_row
+
+DEFAULT_PATH = os.path.join(
+    os.path.expanduser('~'), '.local', 'share', 'ductcalc', 'jobs.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    customer TEXT NOT NULL,
+    quote TEXT NOT NULL,
+    project TEXT NOT NULL DEFAULT '',
+    created TEXT NOT NULL DEFAULT (datetime('now')),
+    UNIQUE (customer, quote)
+);
+CREATE TABLE IF NOT EXISTS parts (
+    id INTEGER PRIMARY KEY,
+    quote_id INTEGER NOT NULL REFERENCES quotes (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    qty REAL NOT NULL,
+    thickness REAL NOT NULL,
+    diameter REAL NOT NULL,
+    bwidth REAL NOT NULL,
+    blength REAL NOT NULL,
+    weight REAL NOT NULL,
+    sqft REAL NOT NULL,
+    kind TEXT,
+    params TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS parts_quote_seq ON parts (quote_id, seq);
+CREATE INDEX IF NOT EXISTS parts_thickness ON parts (thickness);
+CREATE INDEX IF NOT EXISTS parts_type ON parts (type);
+CREATE INDEX IF NOT EXISTS quotes_created ON quotes (created);
+"""
+
+# Columns of a quote row, in COLUMNS order
+_ROW_COLUMNS = 'name, type, qty, thickness, diameter, bwidth, blength, weight, sqft'
+# Groupings of a single quote's totals, as duct_gui keeps them
+QUOTE_GROUPINGS = ('thickness', 'type', 'diameter')
+
+_INSERT_PART = (
+    f'INSERT INTO parts (quote_id, seq, {_ROW_COLUMNS}, kind, params) '
+    f'VALUES ({", ".join("?" * (len(COLUMNS) + 4))})')
+
+
+class JobStore:
+    """Quotes and parts in a SQLite database.
+
+    One connection is shared by all threads and guarded by a lock, so the
+    GUI can open quotes on the main thread and save parts on its worker.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        # With WAL, NORMAL only risks the last commits on power loss,
+        # never corruption.
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> JobStore:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- writing -----------------------------------------------------------
+
+    def open_quote(self, customer: str, quote: str, project: str = '') -> int:
+        """Return the id of a quote, creating it if it doesn't exist yet."""
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO quotes (customer, quote, project) VALUES (?, ?, ?)',
+                (customer, quote, project))
+            if project:
+                self.conn.execute(
+                    'UPDATE quotes SET project = ? WHERE customer = ? AND quote = ?',
+                    (project, customer, quote))
+            return self.conn.execute(
+                'SELECT id FROM quotes WHERE customer = ? AND quote = ?',
+                (customer, quote)).fetchone()[0]
+
+    def find_quote(self, customer: str, quote: str) -> Optional[int]:
+        with self._lock:
+            found = self.conn.execute(
+                'SELECT id FROM quotes WHERE customer = ? AND quote = ?',
+                (customer, quote)).fetchone()
+        return found[0] if found else None
+
+    def add_parts(self, quote_id: int, rows: Iterable[Sequence],
+                  parts: Optional[Iterable[Optional[DxfPart]]] = None) -> int:
+        """Append rows (in ``COLUMNS`` order) to a quote in one transaction.
+
+        Store the rows unrounded; the exports round them for display, and
+        totals rebuilt from the store stay exact.
+
+        ``parts`` optionally gives the ``DxfPart`` of each row so the quote
+        can be redrawn or nested later. Returns the number of rows added.
+        """
+        if parts is None:
+            parts = itertools.repeat(None)
+        with self._lock, self.conn:
+            seq = self.conn.execute(
+                'SELECT COALESCE(MAX(seq), -1) + 1 FROM parts WHERE quote_id = ?',
+                (quote_id,)).fetchone()[0]
+            values = []
+            for n, (row, part) in enumerate(zip(rows, parts), seq):
+                kind = params = None
+                if part is not None:
+                    kind, params = part.kind, json.dumps(list(part.params))
+                values.append((quote_id, n, *row, kind, params))
+            self.conn.executemany(_INSERT_PART, values)
+        return len(values)
+
+    def add_part(self, quote_id: int, row: Sequence, part: Optional[DxfPart] = None) -> None:
+        self.add_parts(quote_id, [row], [part])
+
+    # --- reading -----------------------------------------------------------
+
+    def quotes(self) -> List[tuple]:
+        """Return ``(id, customer, quote, project, created, parts)`` rows."""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT q.id, q.customer, q.quote, q.project, q.created, COUNT(p.id) '
+                'FROM quotes q LEFT JOIN parts p ON p.quote_id = q.id '
+                'GROUP BY q.id ORDER BY q.created, q.id').fetchall()
+
+    def rows(self, quote_id: int, chunk: int = 1024) -> Iterator[list]:
+        """Yield a quote's rows in entry order, fetching ``chunk`` at a time."""
+        last = -1
+        while True:
+            with self._lock:
+                fetched = self.conn.execute(
+                    f'SELECT seq, {_ROW_COLUMNS} FROM parts WHERE quote_id = ? AND seq > ? '
+                    'ORDER BY seq LIMIT ?', (quote_id, last, chunk)).fetchall()
+            for seq, *row in fetched:
+                yield row
+            if len(fetched) < chunk:
+                return
+            last = fetched[-1][0]
+
+    def quote_report(self, quote_id: int,
+                     groupings: Sequence[str] = QUOTE_GROUPINGS) -> QuoteReport:
+        """Return a :class:`QuoteReport` of one quote's rows."""
+        report = QuoteReport(groupings)
+        report.add_rows(self.rows(quote_id))
+        return report
+
+    def usage(self, since: Optional[str] = None, until: Optional[str] = None,
+              thickness: Optional[float] = None) -> List[tuple]:
+        """Return material use across quotes for purchasing.
+
+        Rows are ``(thickness, type, qty, weight, sqft)`` summed over the
+        quotes created in ``[since, until)`` (``YYYY-MM-DD`` strings),
+        optionally for a single thickness.
+        """
+        where, args = [], []
+        if since:
+            where.append('q.created >= ?')
+            args.append(since)
+        if until:
+            where.append('q.created < ?')
+            args.append(until)
+        if thickness is not None:
+            where.append('p.thickness = ?')
+            args.append(thickness)
+        sql = ('SELECT p.thickness, p.type, SUM(p.qty), SUM(p.weight), SUM(p.sqft) '
+               'FROM parts p JOIN quotes q ON q.id = p.quote_id')
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' GROUP BY p.thickness, p.type ORDER BY p.thickness, p.type'
+        with self._lock:
+            return self.conn.execute(sql, args).fetchall()
+
+    def report(self, since: Optional[str] = None, until: Optional[str] = None,
+               thickness: Optional[float] = None) -> QuoteReport:
+        """Return a :class:`QuoteReport` over the quotes created in
+        ``[since, until)``, grouped by thickness, type, diameter band and
+        customer, optionally for a single thickness."""
+        where, args = [], []
+        if since:
+            where.append('q.created >= ?')
+            args.append(since)
+        if until:
+            where.append('q.created < ?')
+            args.append(until)
+        if thickness is not None:
+            where.append('p.thickness = ?')
+            args.append(thickness)
+        sql = ('SELECT p.type, p.qty, p.thickness, p.diameter, p.weight, p.sqft, q.customer '
+               'FROM parts p JOIN quotes q ON q.id = p.quote_id')
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        report = QuoteReport()
+        with self._lock:
+            cursor = self.conn.execute(sql, args)
+            for fetched in iter(lambda: cursor.fetchmany(1000), []):
+                for part in fetched:
+                    report.add(*part)
+        return report
+
+    def load_table(self, quote_id: int) -> DuctTable:
+        """Return a quote as a :class:`DuctTable`, e.g. to reopen it in the GUI."""
+        with self._lock:
+            fetched = self.conn.execute(
+                f'SELECT {_ROW_COLUMNS}, kind, params FROM parts '
+                'WHERE quote_id = ? ORDER BY seq', (quote_id,)).fetchall()
+        table = DuctTable(len(fetched))
+        for *row, kind, params in fetched:
+            part = DxfPart(kind, row[0], tuple(json.loads(params))) if kind else None
+            table.append(*row, part=part)
+        return table
+
+    # --- exports -----------------------------------------------------------
+
+    def footer(self, quote_id: int) -> list:
+        """Return the quote CSV footer, as ``duct_gui`` writes it."""
+        return self.quote_report(quote_id).footer()
+
+    def export_csv(self, quote_id: int, filename: str) -> None:
+        """Write a quote in the same CSV layout as ``duct_gui``, rounded the same way."""
+        with open(filename, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(COLUMNS)
+            writer.writerows(map(display_row, self.rows(quote_id)))
+            writer.writerows(map(display_row, self.footer(quote_id)))
+
+    def export_pdf(self, quote_id: int, filename: str, progress=None, report=None) -> int:
+        """Write a quote as a PDF report and return the number of pages.
+
+        The totals and the per-thickness, per-type and per-diameter tables
+        come from ``report``, a :class:`QuoteReport` of the quote, which is
+        built from the stored rows when not given.
+        """
+        from quote_pdf import write_quote_pdf
+
+        if report is None:
+            report = self.quote_report(quote_id)
+        total = report.total
+        total_row = ['Total', total.qty, '', '', '', '', '', total.weight, total.sqft]
+        return write_quote_pdf(filename, map(display_row, self.rows(quote_id)),
+                               display_row(total_row), report.summary(), COLUMNS,
+                               progress=progress, groups=report.summaries())
+
+
+def default_store() -> JobStore:
+    return JobStore(os.environ.get('DUCTCALC_DB', DEFAULT_PATH))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query the quote database")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List the stored quotes")
+    export = sub.add_parser("export", help="Write a quote as CSV and/or PDF")
+    export.add_argument("customer")
+    export.add_argument("quote")
+    export.add_argument("--csv", metavar="FILE")
+    export.add_argument("--pdf", metavar="FILE")
+    usage = sub.add_parser("usage", help="Material used per thickness and type")
+    usage.add_argument("--since", help="First day, YYYY-MM-DD")
+    usage.add_argument("--until", help="Day after the last, YYYY-MM-DD")
+    usage.add_argument("--thickness", type=float)
+    usage.add_argument("--by", choices=("thickness", "type", "diameter", "customer"),
+                       help="Total per thickness, type, diameter band or customer instead")
+    args = parser.parse_args()
+
+    with default_store() as store:
+        if args.command == "list":
+            for quote_id, customer, quote, project, created, count in store.quotes():
+                print(f"{created}  {customer}  {quote}  {project}  ({count} parts)")
+        elif args.command == "export":
+            quote_id = store.find_quote(args.customer, args.quote)
+            if quote_id is None:
+                parser.error(f"no quote {args.quote!r} for {args.customer!r}")
+            if args.csv:
+                store.export_csv(quote_id, args.csv)
+            if args.pdf:
+                store.export_pdf(quote_id, args.pdf)
+        elif args.by:
+            for label, totals in store.report(
+                    args.since, args.until, args.thickness).groups(args.by):
+                print(f"{label}\tqty {totals.qty:g}\t{totals.weight:.2f} lb\t"
+                      f"{totals.sqft:.2f} sqft")
+        else:
+            for thickness, duct_type, qty, weight, sqft in store.usage(
+                    args.since, args.until, args.thickness):
+                print(f"{thickness}\t{duct_type}\tqty {qty:g}\t{weight:.2f} lb\t{sqft:.2f} sqft")
+
+
+if __name__ == "__main__":
+    main()
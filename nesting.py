@@ -0,0 +1,278 @@
+"""Nest flat patterns onto stock sheets to estimate real material usage.
+
+Costing by bounding box treats every part as if it had a sheet to itself.
+:func:`nest_parts` instead packs the parts of a job onto stock sheets, one
+set of sheets per thickness, and reports how many sheets are used and how
+much of them ends up in parts.
+
+Parts are packed by their bounding rectangles (cone sectors and elbow
+outlines included) with the MaxRects best-short-side-fit heuristic. Each
+sheet keeps its list of maximal free rectangles, and sheets are skipped
+cheaply once they cannot hold any part that is still to be placed, so large
+jobs only ever search the few sheets that still have usable space.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from duct_core import DxfPart
+
+STOCK_SHEETS = ((48.0, 96.0),)
+
+_EPS = 1e-9
+
+
+class Extents(NamedTuple):
+    min_x: float
+    min_y: float
+    max_x: float
+    max_y: float
+
+    @property
+    def width(self) -> float:
+        return self.max_x - self.min_x
+
+    @property
+    def length(self) -> float:
+        return self.max_y - self.min_y
+
+
+def part_extents(part: DxfPart) -> Extents:
+    """Return the bounding box of a part as drawn by its DXF function."""
+    if part.kind == 'straight':
+        width, length = part.params[:2]
+        return Extents(0.0, 0.0, width, length)
+    if part.kind == 'cone':
+        inner, outer, angle = part.params[:3]
+        if angle >= 360:
+            return Extents(-outer, -outer, outer, outer)
+        angles = [0.0, angle] + [a for a in (90, 180, 270) if 0 < a < angle]
+        xs = [r * math.cos(math.radians(a)) for a in angles for r in (inner, outer)]
+        ys = [r * math.sin(math.radians(a)) for a in angles for r in (inner, outer)]
+        return Extents(min(xs), min(ys), max(xs), max(ys))
+    if part.kind == 'elbow':
+        diameter, clr, angle = part.params[:3]
+        mid = diameter * math.pi / 2.0
+        amplitude = diameter / 4.0
+        return Extents(0.0, mid - amplitude, 2.0 * clr * (angle / 90.0), mid + amplitude)
+    raise ValueError(f"unknown part kind {part.kind!r}")
+
+
+def part_area(part: DxfPart) -> float:
+    """Return the area of material a part actually covers."""
+    if part.kind == 'straight':
+        width, length = part.params[:2]
+        return width * length
+    if part.kind == 'cone':
+        inner, outer, angle = part.params[:3]
+        return math.pi * (outer ** 2 - inner ** 2) * min(angle, 360.0) / 360.0
+    if part.kind == 'elbow':
+        from gored_flat_pattern import gored_elbow_area
+
+        # Summed over the gore outlines that are drawn
+        return gored_elbow_area(*part.params)
+    raise ValueError(f"unknown part kind {part.kind!r}")
+
+
+class Placement(NamedTuple):
+    """A part on a sheet: its bounding box starts at ``(x, y)``."""
+
+    part: DxfPart
+    x: float
+    y: float
+    rotated: bool
+
+
+class Sheet:
+    """One stock sheet and the parts nested on it."""
+
+    def __init__(self, width: float, length: float, spacing: float) -> None:
+        self.width = width
+        self.length = length
+        self.placements: List[Placement] = []
+        self.part_area = 0.0
+        # Maximal free rectangles (x, y, w, h). The bin is grown by the part
+        # spacing so parts may touch the sheet edge but not each other.
+        self.free = [(0.0, 0.0, width + spacing, length + spacing)]
+
+    @property
+    def utilisation(self) -> float:
+        return self.part_area / (self.width * self.length)
+
+    def largest_short_side(self) -> float:
+        return max((min(w, h) for _, _, w, h in self.free), default=0.0)
+
+    def find(self, w: float, h: float) -> Optional[Tuple[float, float, float, bool]]:
+        """Return ``(score, x, y, rotated)`` of the best spot for a w x h box."""
+        best = None
+        for fx, fy, fw, fh in self.free:
+            for bw, bh, rotated in ((w, h, False), (h, w, True)):
+                if bw <= fw + _EPS and bh <= fh + _EPS:
+                    score = (min(fw - bw, fh - bh), max(fw - bw, fh - bh))
+                    if best is None or score < best[0]:
+                        best = (score, fx, fy, rotated)
+        return best
+
+    def place(self, x: float, y: float, w: float, h: float) -> None:
+        """Mark the rectangle ``(x, y, w, h)`` as used."""
+        split = []
+        for rect in self.free:
+            fx, fy, fw, fh = rect
+            if (x >= fx + fw - _EPS or x + w <= fx + _EPS
+                    or y >= fy + fh - _EPS or y + h <= fy + _EPS):
+                split.append(rect)
+                continue
+            if x > fx + _EPS:
+                split.append((fx, fy, x - fx, fh))
+            if x + w < fx + fw - _EPS:
+                split.append((x + w, fy, fx + fw - x - w, fh))
+            if y > fy + _EPS:
+                split.append((fx, fy, fw, y - fy))
+            if y + h < fy + fh - _EPS:
+                split.append((fx, y + h, fw, fy + fh - y - h))
+        # Drop free rectangles contained in another one
+        split.sort(key=lambda r: r[2] * r[3], reverse=True)
+        free = []
+        for rect in split:
+            rx, ry, rw, rh = rect
+            if not any(ox - _EPS <= rx and oy - _EPS <= ry
+                       and rx + rw <= ox + ow + _EPS and ry + rh <= oy + oh + _EPS
+                       for ox, oy, ow, oh in free):
+                free.append(rect)
+        self.free = free
+
+
+class ThicknessNest(NamedTuple):
+    """Sheets used for one thickness and parts too big for any stock sheet."""
+
+    sheets: List[Sheet]
+    oversize: List[DxfPart]
+
+    @property
+    def sheet_count(self) -> int:
+        return len(self.sheets)
+
+    @property
+    def utilisation(self) -> float:
+        sheet_area = sum(s.width * s.length for s in self.sheets)
+        return sum(s.part_area for s in self.sheets) / sheet_area if sheet_area else 0.0
+
+
+def _nest_one(items: List[Tuple[DxfPart, Extents, float]],
+              stock: Sequence[Tuple[float, float]],
+              spacing: float) -> ThicknessNest:
+    # Biggest parts first; identical parts end up next to each other.
+    items.sort(key=lambda it: (max(it[1].width, it[1].length),
+                               it[1].width * it[1].length), reverse=True)
+    # Shortest short side among the parts still to place, per position
+    remaining_short = [0.0] * len(items)
+    shortest = math.inf
+    for i in range(len(items) - 1, -1, -1):
+        ext = items[i][1]
+        shortest = min(shortest, min(ext.width, ext.length) + spacing)
+        remaining_short[i] = shortest
+
+    sheets: List[Sheet] = []
+    open_sheets: List[Sheet] = []
+    oversize: List[DxfPart] = []
+    for i, (part, ext, area) in enumerate(items):
+        w, h = ext.width + spacing, ext.length + spacing
+        # Retire sheets that can't take even the smallest part left
+        open_sheets = [s for s in open_sheets
+                       if s.largest_short_side() + _EPS >= remaining_short[i]]
+        spot = None
+        for sheet in open_sheets:
+            spot = sheet.find(w, h)
+            if spot:
+                break
+        if spot is None:
+            for sw, sl in stock:
+                sheet = Sheet(sw, sl, spacing)
+                spot = sheet.find(w, h)
+                if spot:
+                    sheets.append(sheet)
+                    open_sheets.append(sheet)
+                    break
+            else:
+                oversize.append(part)
+                continue
+        _, x, y, rotated = spot
+        sheet.place(x, y, h if rotated else w, w if rotated else h)
+        sheet.placements.append(Placement(part, x, y, rotated))
+        sheet.part_area += area
+    return ThicknessNest(sheets, oversize)
+
+
+def nest_parts(lines: Iterable[Tuple[DxfPart, float, float]],
+               stock: Sequence[Tuple[float, float]] = STOCK_SHEETS,
+               spacing: float = 0.25) -> Dict[float, ThicknessNest]:
+    """Nest the parts of a job onto stock sheets, separately per thickness.
+
+    Parameters
+    ----------
+    lines : iterable of (DxfPart, qty, thickness)
+        Job lines; each is nested ``round(qty)`` times.
+    stock : sequence of (width, length)
+        Stock sheet sizes. A new sheet uses the first size the part fits on.
+    spacing : float, optional
+        Minimum gap between parts.
+
+    Returns a dict mapping thickness to its :class:`ThicknessNest`.
+    """
+    geometry = {}  # (kind, params) -> (extents, area)
+    by_thickness: Dict[float, list] = {}
+    for part, qty, thickness in lines:
+        key = (part.kind, tuple(part.params))
+        if key not in geometry:
+            geometry[key] = (part_extents(part), part_area(part))
+        ext, area = geometry[key]
+        by_thickness.setdefault(thickness, []).extend(
+            [(part, ext, area)] * int(round(qty)))
+    return {t: _nest_one(items, stock, spacing)
+            for t, items in sorted(by_thickness.items())}
+
+
+def write_sheet_dxfs(nest: Dict[float, ThicknessNest], prefix: str = 'sheet') -> List[str]:
+    """Write one DXF per nested sheet and return the filenames.
+
+    Files are named ``{prefix}_{thickness}_{n}.dxf``. Each has the sheet
+    outline on layer ``SHEET`` and the parts as block inserts on a layer named
+    after the part.
+    """
+    from dxf_jobs import add_part
+    from dxf_template import new_part_document
+    from job_dxf import layer_name
+
+    filenames = []
+    for thickness, result in nest.items():
+        for n, sheet in enumerate(result.sheets, 1):
+            doc = new_part_document()
+            msp = doc.modelspace()
+            doc.layers.add('SHEET')
+            msp.add_lwpolyline([(0, 0), (sheet.width, 0), (sheet.width, sheet.length),
+                                (0, sheet.length)], close=True, dxfattribs={'layer': 'SHEET'})
+            blocks = {}
+            for placement in sheet.placements:
+                part = placement.part
+                key = (part.kind, tuple(part.params))
+                if key not in blocks:
+                    block = doc.blocks.new(f"{part.kind.upper()}_{len(blocks) + 1}")
+                    add_part(block, part)
+                    blocks[key] = block.name
+                layer = layer_name(part.name)
+                if layer not in doc.layers:
+                    doc.layers.add(layer)
+                ext = part_extents(part)
+                if placement.rotated:
+                    # Rotating by 90 degrees maps (x, y) to (-y, x)
+                    insert = (placement.x + ext.max_y, placement.y - ext.min_x)
+                else:
+                    insert = (placement.x - ext.min_x, placement.y - ext.min_y)
+                msp.add_blockref(blocks[key], insert, dxfattribs={
+                    'layer': layer, 'rotation': 90 if placement.rotated else 0})
+            filename = f"{prefix}_{thickness}_{n}.dxf"
+            doc.saveas(filename)
+            filenames.append(filename)
+    return filenames
@@ -0,0 +1,203 @@
+"""In-process caches for repeated part geometry.
+
+Big jobs repeat the same straights, reducers and elbows over and over. Two
+LRU caches keyed on the normalised part geometry make every repeat after the
+first one nearly free:
+
+* :data:`metrics_cache` holds computed flat-pattern values, filled by
+  functions wrapped with :func:`memoized`.
+* :data:`dxf_cache` holds the exported DXF text of a part, used by
+  :func:`save_pattern` to write a repeated part without building it again.
+
+Both count hits, misses and evictions in this process; see :func:`cache_stats`.
+"""
+
+from __future__ import annotations
+
+import functools
+import io
+import threading
+from collections import OrderedDict
+import os
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+import dxf_lite
+from dxf_cache import disk_cache, unshare
+from timing import stage
+
+# Dimensions are compared at this many decimal places
+KEY_DECIMALS = 6
+
+# DXF writers save_pattern() can use, and the one used when a call doesn't
+# say: full ezdxf documents, or the minimal R12 files of dxf_lite
+DXF_WRITERS = ('ezdxf', 'lite')
+DXF_WRITER = os.environ.get('DUCTCALC_DXF_WRITER', 'ezdxf')
+
+_MISSING = object()
+
+
+class LRUCache:
+    """A thread-safe least-recently-used cache with a size cap."""
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits,
+            'misses': self.misses, 'evictions': self.evictions,
+        }
+
+
+metrics_cache = LRUCache(4096)
+dxf_cache = LRUCache(256)
+
+
+def geometry_key(kind: str, values) -> tuple:
+    """Return a hashable key for a part type and its dimensions.
+
+    Numbers are rounded to :data:`KEY_DECIMALS` places so values that only
+    differ by float noise share an entry.
+    """
+    return (kind,) + tuple(
+        round(float(v), KEY_DECIMALS) + 0.0 if isinstance(v, (int, float)) else v
+        for v in values
+    )
+
+
+def memoized(func: Callable) -> Callable:
+    """Cache a flat-pattern calculation in :data:`metrics_cache`.
+
+    The wrapped function must only take positional dimension arguments.
+    """
+    kind = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        key = geometry_key(kind, args)
+        result = metrics_cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = func(*args)
+            metrics_cache.put(key, result)
+        return result
+
+    return wrapper
+
+
+def _writer(writer: Optional[str]) -> str:
+    writer = writer or DXF_WRITER
+    if writer not in DXF_WRITERS:
+        raise ValueError(f"writer must be one of {DXF_WRITERS}, not {writer!r}")
+    return writer
+
+
+def save_pattern(filename: str, add: Callable, *params, writer: Optional[str] = None) -> None:
+    """Draw a part with ``add(msp, *params)`` and save it as ``filename``.
+
+    The exported DXF text is kept in :data:`dxf_cache`, so saving the same
+    geometry again only writes the cached text to the new file. Parts not
+    in memory are looked up in the shared on-disk cache (see ``dxf_cache``)
+    before they are drawn. ``writer`` picks the DXF writer, ``'ezdxf'`` or
+    ``'lite'`` (see ``dxf_lite``; not disk cached, it is cheaper than a
+    lookup), and defaults to :data:`DXF_WRITER`.
+    """
+    writer = _writer(writer)
+    key = geometry_key(add.__qualname__, params)
+    if writer == 'lite':
+        key += ('lite',)
+    cached = dxf_cache.get(key)
+    if cached is None:
+        if writer == 'lite':
+            cached = _build_lite(add, params)
+        else:
+            if disk_cache is not None:
+                with stage('dxf_cache'):
+                    if disk_cache.fetch(key, filename):
+                        return
+            cached = _build(add, params)
+            if disk_cache is not None:
+                with stage('dxf_cache'):
+                    disk_cache.store(key, *cached)
+        dxf_cache.put(key, cached)
+    text, encoding = cached
+    with stage('save_dxf'):
+        unshare(filename)
+        # Same file mode ezdxf uses for saveas(); lite output is plain ASCII
+        with open(filename, 'wt', encoding=encoding,
+                  errors='dxfreplace' if writer == 'ezdxf' else 'strict') as fp:
+            fp.write(text)
+
+
+def pattern_text(add: Callable, *params, writer: Optional[str] = None) -> Tuple[str, str]:
+    """Return the DXF text and encoding of the part ``add(msp, *params)`` draws.
+
+    Uses :data:`dxf_cache` like :func:`save_pattern`, but writes no file.
+    """
+    writer = _writer(writer)
+    key = geometry_key(add.__qualname__, params)
+    if writer == 'lite':
+        key += ('lite',)
+    cached = dxf_cache.get(key)
+    if cached is None:
+        cached = _build_lite(add, params) if writer == 'lite' else _build(add, params)
+        dxf_cache.put(key, cached)
+    return cached
+
+
+def _build(add: Callable, params: tuple) -> Tuple[str, str]:
+    with stage('build_dxf'):
+        from dxf_template import part_document  # ezdxf is only loaded to draw
+
+        doc = part_document()
+        add(doc.modelspace(), *params)
+        stream = io.StringIO()
+        doc.write(stream)
+        return stream.getvalue(), doc.output_encoding
+
+
+def _build_lite(add: Callable, params: tuple) -> Tuple[str, str]:
+    with stage('build_dxf'):
+        return dxf_lite.dxf_text(add, *params), dxf_lite.ENCODING
+
+
+def cache_stats() -> dict:
+    """Return the hit/miss/eviction counters of the caches.
+
+    The counters are per process: with ``-j`` workers they only cover the
+    parent, not the parts the workers drew.
+    """
+    stats = {'metrics': metrics_cache.stats(), 'dxf': dxf_cache.stats()}
+    if disk_cache is not None:
+        stats['disk'] = disk_cache.stats()
+    return stats
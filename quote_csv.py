@@ -0,0 +1,83 @@
+"""Incremental writer for the quote CSV produced by ``duct_gui``.
+
+The file layout is unchanged: a header row, one row per duct and a footer
+with the totals and per-group lines (see ``rollups.QuoteReport.footer``).
+Instead of re-serialising the whole
+quote after every entry, the file is kept open, new rows are written where
+the footer used to start and only the (small) footer is rewritten behind
+them.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+from typing import Iterable, Sequence
+
+SYNC_POLICIES = ('none', 'flush', 'fsync')
+
+
+class QuoteCsvWriter:
+    """Append rows to a quote CSV while keeping a rewritable footer.
+
+    Parameters
+    ----------
+    filename : str
+        CSV file to create (an existing file is truncated).
+    header : sequence
+        Column names written as the first row.
+    sync : str, optional
+        What to do after every append: ``'none'`` leaves the data in the
+        Python buffer, ``'flush'`` hands it to the OS so other readers see it
+        and ``'fsync'`` also forces it to disk.
+    """
+
+    def __init__(self, filename: str, header: Sequence, sync: str = 'flush') -> None:
+        if sync not in SYNC_POLICIES:
+            raise ValueError(f"sync must be one of {SYNC_POLICIES}, not {sync!r}")
+        self.filename = filename
+        self.sync = sync
+        self.file = open(filename, 'w+', newline='')
+        self._writer = csv.writer(self.file)
+        self._writer.writerow(header)
+        self._rows_end = self.file.tell()
+        self._sync()
+
+    def append(self, row: Sequence, footer: Iterable[Sequence] = ()) -> None:
+        """Write ``row`` after the existing rows and replace the footer."""
+        self.file.seek(self._rows_end)
+        self._writer.writerow(row)
+        self._rows_end = self.file.tell()
+        self._write_footer(footer)
+
+    def extend(self, rows: Iterable[Sequence], footer: Iterable[Sequence] = ()) -> None:
+        """Write several rows at once, then replace the footer."""
+        self.file.seek(self._rows_end)
+        self._writer.writerows(rows)
+        self._rows_end = self.file.tell()
+        self._write_footer(footer)
+
+    def set_footer(self, footer: Iterable[Sequence]) -> None:
+        """Replace the footer without adding a row."""
+        self.file.seek(self._rows_end)
+        self._write_footer(footer)
+
+    def _write_footer(self, footer: Iterable[Sequence]) -> None:
+        self._writer.writerows(footer)
+        self.file.truncate()
+        self._sync()
+
+    def _sync(self) -> None:
+        if self.sync != 'none':
+            self.file.flush()
+            if self.sync == 'fsync':
+                os.fsync(self.file.fileno())
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> QuoteCsvWriter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,149 @@
+"""Write the quote PDF one page at a time.
+
+Building a single platypus ``Table`` out of every row lays the whole quote
+out at once, which gets slow and memory hungry past a few thousand rows.
+:func:`write_quote_pdf` instead takes the rows from an iterator and draws
+them straight onto the canvas as one small fixed-layout table per page, so
+time grows linearly with the row count and only the compressed pages are
+kept in memory. The per-thickness summary, and any other group summaries
+(per type, diameter band, ...), are passed in ready-made from the running
+totals instead of being recomputed from the rows. Like the quote rows, a
+summary table longer than the room left on a page is continued on the next
+page under a repeated header.
+
+No browser is opened here; callers decide whether to show the file.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Iterable, Optional, Sequence, Tuple
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+
+from timing import stage
+
+MARGIN = inch
+ROW_HEIGHT = 14.0
+FONT_SIZE = 7
+
+SUMMARY_HEADER = ('Thickness', 'Total Weight', 'Total SQFT')
+
+_TABLE_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), FONT_SIZE),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+])
+_SUMMARY_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), FONT_SIZE),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+])
+
+
+def _col_widths(columns: Sequence[str], width: float) -> list:
+    # The name column gets twice the room of the numeric columns
+    weights = [2.0] + [1.0] * (len(columns) - 1)
+    return [width * w / sum(weights) for w in weights]
+
+
+def _draw_table(canv, data, col_widths, style, top: float) -> float:
+    """Draw a fixed-row-height table below ``top``; return its bottom y."""
+    table = Table(data, colWidths=col_widths, rowHeights=ROW_HEIGHT, hAlign='LEFT')
+    table.setStyle(style)
+    height = ROW_HEIGHT * len(data)
+    table.wrapOn(canv, sum(col_widths), height)
+    table.drawOn(canv, MARGIN, top - height)
+    return top - height
+
+
+def write_quote_pdf(filename: str,
+                    rows: Iterable[Sequence],
+                    total_row: Sequence,
+                    summary: Iterable[Sequence],
+                    columns: Sequence[str],
+                    progress: Optional[Callable[[int], None]] = None,
+                    pagesize=letter,
+                    groups: Iterable[Tuple[str, Iterable[Sequence]]] = ()) -> int:
+    """Write a quote report and return the number of pages.
+
+    Parameters
+    ----------
+    filename : str
+        PDF file to write.
+    rows : iterable of sequences
+        Quote rows, consumed one page at a time.
+    total_row : sequence
+        Row of totals drawn after the last quote row.
+    summary : iterable of (thickness, weight, sqft)
+        Per-thickness totals for the summary table.
+    columns : sequence of str
+        Column headings, repeated on every page.
+    progress : callable, optional
+        Called with the page number after each finished page. It may raise
+        to abort the export, in which case no file is written.
+    groups : iterable of (title, summary), optional
+        Further summary tables drawn after the per-thickness one, e.g.
+        ``QuoteReport.summaries()``; each summary is ``(key, weight, sqft)``
+        rows and ``title`` heads its key column.
+    """
+    with stage('export_pdf'):
+        return _write(filename, rows, total_row, summary, columns, progress, pagesize, groups)
+
+
+def _write(filename, rows, total_row, summary, columns, progress, pagesize, groups) -> int:
+    page_width, page_height = pagesize
+    col_widths = _col_widths(columns, page_width - 2 * MARGIN)
+    top = page_height - MARGIN
+    per_page = int((page_height - 2 * MARGIN) // ROW_HEIGHT) - 1
+    header = [list(columns)]
+
+    canv = canvas.Canvas(filename, pagesize=pagesize, pageCompression=1)
+    pages = 0
+
+    def end_page():
+        nonlocal pages
+        canv.showPage()
+        pages += 1
+        if progress is not None:
+            progress(pages)
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == per_page:
+            _draw_table(canv, header + chunk, col_widths, _TABLE_STYLE, top)
+            end_page()
+            chunk = []
+    chunk.append(total_row)
+    y = _draw_table(canv, header + chunk, col_widths, _TABLE_STYLE, top)
+
+    tables = [(SUMMARY_HEADER[0], summary)]
+    tables.extend(groups)
+    for title, rows in tables:
+        summary_header = [title, *SUMMARY_HEADER[1:]]
+        summary_data = [[str(k), round(w, 2), round(s, 2)] for k, w, s in rows]
+        y -= 12  # gap between the tables
+        # Draw what fits under a header and continue on the next page
+        while True:
+            room = int((y - MARGIN) // ROW_HEIGHT) - 1  # rows below the header
+            if room < 1:
+                end_page()
+                y = top
+                continue
+            y = _draw_table(canv, [summary_header] + summary_data[:room],
+                            [inch * 1.2] * 3, _SUMMARY_STYLE, y)
+            summary_data = summary_data[room:]
+            if not summary_data:
+                break
+            end_page()
+            y = top
+    end_page()
+    canv.save()
+    return pages
@@ -0,0 +1,454 @@
+"""Local HTTP service quoting ducts for other programs, e.g. the ERP.
+
+Run ``python quote_server.py [--port 8765] [--workers N] [--out-dir DIR]``
+and talk JSON to it:
+
+``POST /straight``, ``/cone``, ``/elbow``
+    Cost one part and return its quote row. The bodies hold ``name``,
+    ``qty`` (default 1) and ``thickness`` plus ``diameter`` and ``length``
+    for straights, ``small_diameter``, ``large_diameter`` and ``height`` for
+    cones, and ``diameter``, ``clr`` and ``degree`` for gored elbows. The
+    numbers are the same the GUI enters into a quote.
+``POST /straight/dxf``, ``/cone/dxf``, ``/elbow/dxf``
+    Same body; return the part's flat pattern DXF.
+``POST /jobs``
+    ``{"parts": [{"type": "straight", ...}, ...], "dxf": true}`` queues a
+    whole job and answers ``202`` with its id. The job's quote CSV and DXFs
+    are written under ``<out-dir>/<id>/``.
+``GET /jobs/<id>``, ``/jobs/<id>/csv``, ``/jobs/<id>/dxf/<name>``
+    Job status, its quote CSV and one of its DXFs.
+``GET /health``
+    Queue and pool counters.
+
+Costing is microseconds of arithmetic and is answered on the request thread.
+Drawing is shared by all requests through one process pool. Both the DXFs in
+flight and the queue of jobs are bounded; when either is full the request
+gets ``503`` with ``Retry-After`` instead of piling up in memory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from duct_core import DxfPart, check_cone, gored_elbow, reducing_cone, straight_duct
+from duct_table import COLUMNS, NUMERIC_COLUMNS, DuctTable
+from dxf_jobs import generate_dxfs, part_text, safe_names
+from quote_csv import QuoteCsvWriter
+from rollups import QuoteReport, display_row
+from timing import stage
+
+DEFAULT_PORT = 8765
+
+# Largest request body accepted, in bytes
+MAX_BODY = 16 * 1024 * 1024
+
+# Finished jobs whose status is kept in memory; their files stay on disk
+KEEP_JOBS = 1000
+
+# Seconds a part DXF request waits for a free pool slot before a 503
+SLOT_TIMEOUT = 2.0
+
+# Quote row type and the required fields of each part kind
+KINDS = {
+    'straight': ('Straight', ('thickness', 'diameter', 'length')),
+    'cone': ('Reducing Cone', ('thickness', 'small_diameter', 'large_diameter', 'height')),
+    'elbow': ('Gored Elbow', ('thickness', 'diameter', 'clr', 'degree')),
+}
+
+
+# Group totals in the job CSV footer, as in the quote CSV of duct_gui
+REPORT_GROUPINGS = ('thickness', 'type', 'diameter')
+
+
+class Busy(Exception):
+    """Raised when a bounded queue is full; answered with ``503``."""
+
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _number(spec: dict, field: str) -> float:
+    try:
+        value = spec[field]
+    except KeyError:
+        raise ValueError(f"missing field {field!r}") from None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field!r} must be a number, not {value!r}") from None
+    if not math.isfinite(number) or number <= 0:
+        raise ValueError(f"{field!r} must be a positive number, not {value!r}")
+    return number
+
+
+def quote_part(kind: str, spec: dict) -> tuple:
+    """Cost one part the way ``duct_gui`` does.
+
+    Returns ``(row, part)``: the quote row as ``[name, type, qty, thickness,
+    diameter, bwidth, blength, weight, sqft]``, unrounded, and the
+    :class:`DxfPart` to draw it. Raises ``ValueError``
+    for a bad kind, a missing, non-finite or non-positive field, or for a
+    cone that doesn't get wider.
+    """
+    try:
+        duct_type, fields = KINDS[kind]
+    except KeyError:
+        raise ValueError(f"unknown part type {kind!r}") from None
+    name = str(spec.get('name') or kind)
+    qty = _number(spec, 'qty') if 'qty' in spec else 1.0
+    thickness, a, b, *c = (_number(spec, f) for f in fields)
+    with stage('compute'):
+        if kind == 'straight':
+            circumference, weight, sqft = straight_duct(thickness, a, b, qty)
+            row = [qty, thickness, a, circumference, b, weight, sqft]
+            part = DxfPart('straight', name, (circumference, b))
+        elif kind == 'cone':
+            check_cone(a, b, c[0])
+            p, q, d, b_width, b_length, b_weight, b_sqft = reducing_cone(thickness, a, b, c[0])
+            row = [qty, thickness, a, b_width, b_length, b_weight, b_sqft]
+            part = DxfPart('cone', name, (p, q, d))
+        else:
+            bwidth, blength, weight, sqft = gored_elbow(thickness, a, b, c[0], qty)
+            row = [qty, thickness, a, bwidth, blength, weight, sqft]
+            part = DxfPart('elbow', name, (a, b, c[0]))
+    return [name, duct_type, *row], part
+
+
+def _dxf_bytes(part: DxfPart, writer: Optional[str]) -> bytes:
+    # Runs in the pool; encoded there so only bytes cross the process boundary
+    text, encoding = part_text(part, writer)
+    return text.encode(encoding, errors='dxfreplace')
+
+
+class Job:
+    """A whole takeoff submitted to ``POST /jobs``."""
+
+    def __init__(self, table: DuctTable, report: QuoteReport, parts: list, draw: bool,
+                 out_dir: str) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.table = table
+        self.report = report
+        self.parts = parts
+        self.draw = draw
+        self.dir = os.path.join(out_dir, self.id)
+        self.status = 'queued'
+        self.drawn = 0
+        self.errors = []
+        self.dxfs = {}  # file name without extension -> path
+
+    @property
+    def csv_path(self) -> str:
+        return os.path.join(self.dir, 'quote.csv')
+
+    def info(self) -> dict:
+        return {
+            'id': self.id, 'status': self.status, 'parts': len(self.parts),
+            'drawn': self.drawn, 'errors': self.errors[:100],
+            'total_qty': self.report.total.qty,
+            'total_weight': self.report.total.weight,
+            'total_sqft': self.report.total.sqft,
+            'csv': f"/jobs/{self.id}/csv",
+            'dxf': [f"/jobs/{self.id}/dxf/{name}" for name in self.dxfs],
+        }
+
+
+class QuoteService:
+    """The quoting work behind the HTTP handlers, usable without a server.
+
+    Parameters
+    ----------
+    out_dir : str
+        Directory the job folders are created in.
+    workers : int, optional
+        Processes drawing DXFs (default: CPU count).
+    job_threads : int
+        Jobs written at the same time.
+    max_jobs : int
+        Jobs allowed to wait in the queue.
+    writer : str, optional
+        DXF writer, ``'ezdxf'`` or ``'lite'``; see ``pattern_cache.save_pattern``.
+    """
+
+    def __init__(self, out_dir: str = 'quote_jobs', workers: Optional[int] = None,
+                 job_threads: int = 2, max_jobs: int = 64,
+                 writer: Optional[str] = None) -> None:
+        self.out_dir = out_dir
+        self.writer = writer
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = threading.BoundedSemaphore(self.workers * 4)
+        self._in_flight = 0
+        self._jobs: queue.Queue = queue.Queue(maxsize=max_jobs)
+        self._lock = threading.Lock()
+        self.jobs: OrderedDict = OrderedDict()
+        self._threads = [threading.Thread(target=self._run_jobs, name=f'quote-job-{i}',
+                                          daemon=True)
+                         for i in range(job_threads)]
+        for thread in self._threads:
+            thread.start()
+
+    def calculate(self, kind: str, spec: dict) -> dict:
+        row, part = quote_part(kind, spec)
+        result = dict(zip(('name', 'type', *NUMERIC_COLUMNS), display_row(row)))
+        result['dxf_params'] = list(part.params)
+        return result
+
+    def part_dxf(self, kind: str, spec: dict) -> tuple:
+        """Return ``(file name, DXF bytes)`` of one part."""
+        row, part = quote_part(kind, spec)
+        if not self._slots.acquire(timeout=SLOT_TIMEOUT):
+            raise Busy('too many DXFs in progress')
+        try:
+            with self._lock:
+                self._in_flight += 1
+            data = self.pool.submit(_dxf_bytes, part, self.writer).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+        return safe_names([part.name])[0] + '.dxf', data
+
+    def submit_job(self, spec: dict) -> Job:
+        specs = spec.get('parts')
+        if not isinstance(specs, list) or not specs:
+            raise ValueError("'parts' must be a non-empty list")
+        table, report, parts = DuctTable(len(specs)), QuoteReport(REPORT_GROUPINGS), []
+        for i, part_spec in enumerate(specs):
+            if not isinstance(part_spec, dict):
+                raise ValueError(f"part {i} must be an object")
+            try:
+                row, part = quote_part(part_spec.get('type', ''), part_spec)
+            except ValueError as exc:
+                raise ValueError(f"part {i}: {exc}") from None
+            table.append(*row, part=part)
+            report.add_rows([row])
+            parts.append(part)
+        job = Job(table, report, parts, bool(spec.get('dxf', True)), self.out_dir)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._forget_old_jobs()
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self.jobs[job.id]
+            raise Busy('job queue is full') from None
+        return job
+
+    def job(self, job_id: str) -> Job:
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"no job {job_id!r}")
+        return job
+
+    def health(self) -> dict:
+        return {'status': 'ok', 'workers': self.workers,
+                'jobs_queued': self._jobs.qsize(), 'dxf_in_flight': self._in_flight}
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+        self.pool.shutdown()
+
+    def _forget_old_jobs(self) -> None:
+        finished = [i for i, j in self.jobs.items() if j.status in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - KEEP_JOBS)]:
+            del self.jobs[job_id]
+
+    def _run_jobs(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            job.status = 'running'
+            try:
+                self._write_job(job)
+            except Exception as exc:
+                job.errors.append(str(exc))
+                job.status = 'failed'
+            else:
+                job.status = 'done'
+
+    def _write_job(self, job: Job) -> None:
+        os.makedirs(job.dir, exist_ok=True)
+        with QuoteCsvWriter(job.csv_path, COLUMNS, sync='none') as writer:
+            writer.extend(map(display_row, job.table.iter_rows()),
+                          map(display_row, job.report.footer()))
+        if not job.draw:
+            return
+        names = safe_names(part.name for part in job.parts)
+        parts = [part._replace(name=name) for part, name in zip(job.parts, names)]
+        for result in generate_dxfs(parts, job.dir, workers=self.workers,
+                                    executor=self.pool, writer=self.writer):
+            if result.error is None:
+                job.dxfs[result.name] = result.filename
+                job.drawn += 1
+            else:
+                job.errors.append(f"{result.name}: {result.error}")
+
+
+class QuoteHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's :class:`QuoteService`."""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, so clients can reuse a connection
+    # Headers and body go out in separate writes; with Nagle on, every
+    # keep-alive response waits ~40 ms for the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        self._handle(self._get)
+
+    def do_POST(self) -> None:
+        self._handle(self._post)
+
+    def _get(self, path: list) -> None:
+        service = self.server.service
+        if path == ['health']:
+            return self._json(service.health())
+        if len(path) >= 2 and path[0] == 'jobs':
+            job = service.job(path[1])
+            if len(path) == 2:
+                return self._json(job.info())
+            if job.status in ('queued', 'running'):
+                raise HttpError(HTTPStatus.CONFLICT, f"job is {job.status}")
+            if path[2:] == ['csv']:
+                return self._file(job.csv_path, 'text/csv', f"{job.id}.csv")
+            if len(path) == 4 and path[2] == 'dxf':
+                name = path[3][:-4] if path[3].endswith('.dxf') else path[3]
+                filename = job.dxfs.get(name)
+                if filename is not None:
+                    return self._file(filename, 'application/dxf', f"{name}.dxf")
+            raise HttpError(HTTPStatus.NOT_FOUND, 'not found')
+        raise HttpError(HTTPStatus.NOT_FOUND, 'not found')
+
+    def _post(self, path: list) -> None:
+        service = self.server.service
+        spec = self._body()
+        if path == ['jobs']:
+            job = service.submit_job(spec)
+            return self._json(job.info(), HTTPStatus.ACCEPTED)
+        if len(path) == 1 and path[0] in KINDS:
+            return self._json(service.calculate(path[0], spec))
+        if len(path) == 2 and path[0] in KINDS and path[1] == 'dxf':
+            name, data = service.part_dxf(path[0], spec)
+            return self._send(data, 'application/dxf', name)
+        raise HttpError(HTTPStatus.NOT_FOUND, 'not found')
+
+    def _handle(self, route) -> None:
+        path = [p for p in self.path.split('?', 1)[0].split('/') if p]
+        try:
+            route(path)
+        except HttpError as exc:
+            self._error(exc.status, str(exc))
+        except Busy as exc:
+            self._error(HTTPStatus.SERVICE_UNAVAILABLE, str(exc), {'Retry-After': '1'})
+        except ValueError as exc:
+            self._error(HTTPStatus.BAD_REQUEST, str(exc))
+        except Exception as exc:  # answer the client instead of dropping the connection
+            print(f"Error handling {self.requestline!r}:", file=sys.stderr)
+            traceback.print_exc()
+            self.close_connection = True
+            self._error(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(exc).__name__}: {exc}")
+
+    def _body(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            self.close_connection = True
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'request body too large')
+        try:
+            spec = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            raise ValueError('request body is not valid JSON') from None
+        if not isinstance(spec, dict):
+            raise ValueError('request body must be a JSON object')
+        return spec
+
+    def _json(self, value, status: HTTPStatus = HTTPStatus.OK) -> None:
+        self._send(json.dumps(value).encode(), 'application/json', status=status)
+
+    def _error(self, status: HTTPStatus, message: str, headers: Optional[dict] = None) -> None:
+        self._send(json.dumps({'error': message}).encode(), 'application/json',
+                   status=status, headers=headers)
+
+    def _file(self, filename: str, content_type: str, name: str) -> None:
+        with open(filename, 'rb') as fp:
+            self._send(fp.read(), content_type, name)
+
+    def _send(self, data: bytes, content_type: str, name: Optional[str] = None,
+              status: HTTPStatus = HTTPStatus.OK, headers: Optional[dict] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        if name is not None:
+            self.send_header('Content-Disposition', f'attachment; filename="{name}"')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class QuoteServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address: tuple, service: QuoteService, verbose: bool = False) -> None:
+        super().__init__(address, QuoteHandler)
+        self.service = service
+        self.verbose = verbose
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Serve duct quotes and DXFs over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes drawing DXFs (default: CPU count)')
+    parser.add_argument('--job-threads', type=int, default=2,
+                        help='jobs written at the same time (default: 2)')
+    parser.add_argument('--max-jobs', type=int, default=64,
+                        help='jobs allowed to wait before answering 503 (default: 64)')
+    parser.add_argument('--out-dir', default='quote_jobs',
+                        help='directory job CSVs and DXFs are written to')
+    parser.add_argument('--dxf-writer', choices=('ezdxf', 'lite'),
+                        help="DXF writer; 'lite' writes minimal R12 files much faster")
+    parser.add_argument('-v', '--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    service = QuoteService(args.out_dir, args.workers, args.job_threads, args.max_jobs,
+                           args.dxf_writer)
+    server = QuoteServer((args.host, args.port), service, args.verbose)
+    print(f"Serving quotes on http://{args.host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Incremental group-by totals of a quote.
+
+:class:`QuoteReport` keeps the quote totals and per-group totals for any
+number of groupings (thickness, duct type, diameter band, customer) up to
+date as parts are added, so the CSV footer, the PDF summaries and the GUI
+labels read them without rescanning the parts or re-sorting the groups.
+
+Totals are accumulated from the unrounded weights and areas with exact
+float summation (:class:`ExactSum`, the running form of ``math.fsum``), so
+they don't drift with the number of parts or depend on the order they were
+entered in. Adding a part costs a few additions per grouping; the sorted
+key list of a grouping only changes when a new key appears. Round only what
+is shown or exported, with :func:`display_row`.
+"""
+
+from __future__ import annotations
+
+import bisect
+import copy
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Width of the diameter bands, in inches
+BAND_WIDTH = 6.0
+
+DEFAULT_GROUPINGS = ('thickness', 'type', 'diameter', 'customer')
+
+# Index of the thickness in a quote row
+THICKNESS_COLUMN = 3
+
+
+class ExactSum:
+    """A running float sum without rounding error.
+
+    Keeps the sum as non-overlapping partials (Shewchuk's algorithm, as in
+    ``math.fsum``); :attr:`value` is the correctly rounded total. There are
+    rarely more than two or three partials, so :meth:`add` is O(1) in
+    practice.
+    """
+
+    __slots__ = ('_partials',)
+
+    def __init__(self) -> None:
+        self._partials = []
+
+    def add(self, x: float) -> None:
+        partials = self._partials
+        i = 0
+        for y in partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                partials[i] = lo
+                i += 1
+            x = hi
+        partials[i:] = [x]
+
+    @property
+    def value(self) -> float:
+        return math.fsum(self._partials)
+
+
+class Totals:
+    """Part count and exact QTY, weight and SQFT totals of one group."""
+
+    __slots__ = ('count', '_qty', '_weight', '_sqft')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._qty = ExactSum()
+        self._weight = ExactSum()
+        self._sqft = ExactSum()
+
+    def add(self, qty: float, weight: float, sqft: float) -> None:
+        self.count += 1
+        self._qty.add(qty)
+        self._weight.add(weight)
+        self._sqft.add(sqft)
+
+    @property
+    def qty(self) -> float:
+        return self._qty.value
+
+    @property
+    def weight(self) -> float:
+        return self._weight.value
+
+    @property
+    def sqft(self) -> float:
+        return self._sqft.value
+
+
+class Grouping:
+    """Totals per key of one grouping, with the keys kept sorted."""
+
+    def __init__(self, name: str, title: str, key: Callable, label: Callable = str) -> None:
+        self.name = name
+        self.title = title
+        self.key = key
+        self.label = label
+        self.totals: Dict = {}
+        self._keys: List = []
+
+    def add(self, part: dict, qty: float, weight: float, sqft: float) -> None:
+        key = self.key(part)
+        totals = self.totals.get(key)
+        if totals is None:
+            totals = self.totals[key] = Totals()
+            bisect.insort(self._keys, key)
+        totals.add(qty, weight, sqft)
+
+    def items(self) -> List[Tuple[str, Totals]]:
+        """Return ``(label, totals)`` per key, in key order."""
+        return [(self.label(key), self.totals[key]) for key in self._keys]
+
+
+def display_row(row: Iterable, ndigits: int = 2) -> list:
+    """Return a quote or footer row with its floats rounded for display.
+
+    The thickness column is shown as entered, since gauges like 0.0598
+    need more digits than the dimensions and totals.
+    """
+    return [round(value, ndigits) if isinstance(value, float) and i != THICKNESS_COLUMN
+            else value for i, value in enumerate(row)]
+
+
+def diameter_band(diameter: float, width: float = BAND_WIDTH) -> float:
+    """Return the lower bound of the diameter band ``diameter`` falls in."""
+    return math.floor(diameter / width) * width
+
+
+def _groupings(band_width: float) -> Dict[str, Grouping]:
+    return {
+        'thickness': Grouping('thickness', 'Thickness', lambda p: p['thickness']),
+        'type': Grouping('type', 'Type', lambda p: p['type']),
+        'diameter': Grouping('diameter', 'Diameter',
+                             lambda p: diameter_band(p['diameter'], band_width),
+                             lambda lo: f'{lo:g}-{lo + band_width:g}"'),
+        'customer': Grouping('customer', 'Customer', lambda p: p['customer']),
+    }
+
+
+class QuoteReport:
+    """Quote totals and per-group totals, updated part by part.
+
+    Parameters
+    ----------
+    groupings : sequence of str
+        Which of ``'thickness'``, ``'type'``, ``'diameter'`` (banded by
+        ``band_width``) and ``'customer'`` to keep totals for.
+    band_width : float
+        Width of the diameter bands.
+    """
+
+    def __init__(self, groupings: Sequence[str] = DEFAULT_GROUPINGS,
+                 band_width: float = BAND_WIDTH) -> None:
+        available = _groupings(band_width)
+        unknown = set(groupings) - set(available)
+        if unknown:
+            raise ValueError(f"unknown groupings {sorted(unknown)}; "
+                             f"choose from {sorted(available)}")
+        self.total = Totals()
+        self.groupings = {name: available[name] for name in groupings}
+
+    def add(self, duct_type: str, qty: float, thickness: float, diameter: float,
+            weight: float, sqft: float, customer: str = '') -> None:
+        """Add one part; ``weight`` and ``sqft`` should be unrounded."""
+        part = {'type': duct_type, 'thickness': thickness, 'diameter': diameter,
+                'customer': customer}
+        self.total.add(qty, weight, sqft)
+        for grouping in self.groupings.values():
+            grouping.add(part, qty, weight, sqft)
+
+    def add_rows(self, rows: Iterable[Sequence], customer: str = '') -> None:
+        """Add ``duct_gui`` rows (``[name, type, qty, thickness, diameter,
+        bwidth, blength, weight, sqft]``), e.g. of a reopened quote."""
+        for row in rows:
+            self.add(row[1], row[2], row[3], row[4], row[7], row[8], customer)
+
+    def groups(self, grouping: str) -> List[Tuple[str, Totals]]:
+        """Return ``(label, totals)`` per group of ``grouping``, sorted."""
+        return self.groupings[grouping].items()
+
+    def summary(self, grouping: str = 'thickness') -> List[Tuple[str, float, float]]:
+        """Return ``(label, weight, sqft)`` per group, as the PDF shows them."""
+        return [(label, t.weight, t.sqft) for label, t in self.groups(grouping)]
+
+    def summaries(self, groupings: Optional[Sequence[str]] = None) -> List[tuple]:
+        """Return ``(title, summary)`` for each grouping but thickness."""
+        names = groupings if groupings is not None else [
+            name for name in self.groupings if name != 'thickness']
+        return [(self.groupings[name].title, self.summary(name)) for name in names]
+
+    def footer(self) -> list:
+        """Return the quote CSV footer.
+
+        The totals row comes first, then a weight and a SQFT line per
+        thickness; every other grouping adds one ``'<Title> <key>'`` line per group with its QTY, weight and
+        SQFT in the total row's columns.
+        """
+        total = self.total
+        footer = [['Total:', total.qty, '', '', '', '', total.weight, total.sqft]]
+        if 'thickness' in self.groupings:
+            by_thickness = self.groups('thickness')
+            footer.extend([f'Total Weight {label}', '', '', '', '', '', t.weight, '']
+                          for label, t in by_thickness)
+            footer.extend([f'Total SQFT {label}', '', '', '', '', '', '', t.sqft]
+                          for label, t in by_thickness)
+        for name, grouping in self.groupings.items():
+            if name != 'thickness':
+                footer.extend([f'{grouping.title} {label}', t.qty, '', '', '', '',
+                               t.weight, t.sqft] for label, t in grouping.items())
+        return footer
+
+    def copy(self) -> QuoteReport:
+        """Return an independent copy, e.g. to hand to another thread."""
+        return copy.deepcopy(self)
@@ -0,0 +1,30 @@
+"""The modules are top-level scripts; import them from the repository root.
+
+The shared on-disk DXF cache is never used: it is off while the modules are
+imported, and every test gets its own empty cache under ``tmp_path`` (also
+for worker processes started during the test).
+"""
+
+import os
+import sys
+
+import pytest
+
+os.environ['DUCTCALC_DXF_CACHE'] = 'off'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dxf_cache  # noqa: E402
+import pattern_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def dxf_disk_cache(tmp_path, monkeypatch):
+    """Point the DXF caches at an empty per-test directory."""
+    directory = str(tmp_path / 'dxf-cache')
+    monkeypatch.setenv('DUCTCALC_DXF_CACHE', directory)
+    cache = dxf_cache.DiskCache(directory, 64 * 2 ** 20)
+    monkeypatch.setattr(dxf_cache, 'disk_cache', cache)
+    monkeypatch.setattr(pattern_cache, 'disk_cache', cache)
+    pattern_cache.dxf_cache.clear()
+    yield cache
+    pattern_cache.dxf_cache.clear()
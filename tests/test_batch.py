@@ -0,0 +1,39 @@
+"""Batch mode on small takeoffs."""
+
+import csv
+import os
+
+import pytest
+
+import ductCalc
+
+HEADER = 'type,name,qty,thickness,dia,length,small_dia,large_dia,height\n'
+
+
+def write_takeoff(path, *lines):
+    path.write_text(HEADER + ''.join(line + '\n' for line in lines))
+    return str(path)
+
+
+def test_batch_writes_csv_and_footer(tmp_path):
+    takeoff = write_takeoff(tmp_path / 'takeoff.csv',
+                            'S,s1,2,0.04,12,60,,,', 'C,c1,1,0.04,,,8,12,18')
+    output = str(tmp_path / 'out.csv')
+    assert ductCalc.run_batch(takeoff, output, draw=False) == 2
+    rows = list(csv.reader(open(output, newline='')))
+    assert rows[0] == ductCalc.HEADER
+    assert [row[0] for row in rows[1:3]] == ['s1', 'c1']
+    assert rows[3][0] == 'Total:' and float(rows[3][1]) == 3
+    assert not os.path.exists(output + '.part')
+
+
+@pytest.mark.parametrize('cone', ['C,c2,1,0.04,,,12,12,18',   # no taper
+                                  'C,c2,1,0.04,,,14,12,18',   # inverted
+                                  'C,c2,1,0.04,,,8,12,0'])
+def test_bad_cone_row(tmp_path, cone):
+    takeoff = write_takeoff(tmp_path / 'takeoff.csv', 'C,c1,1,0.04,,,8,12,18', cone)
+    output = tmp_path / 'out.csv'
+    with pytest.raises(ValueError, match=r'takeoff\.csv:3: bad takeoff row: cone'):
+        ductCalc.run_batch(takeoff, str(output), draw=False)
+    # Nothing half-written is left behind
+    assert os.listdir(tmp_path) == ['takeoff.csv']
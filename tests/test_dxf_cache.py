@@ -0,0 +1,47 @@
+"""The shared DXF cache under concurrent use."""
+
+import os
+import time
+
+from dxf_cache import DiskCache
+
+
+def fill(cache, count):
+    return [cache.store(('part', i), f'DXF {i}\n' * 100, 'utf8') for i in range(count)]
+
+
+def test_prune_evicts_oldest_first(tmp_path):
+    cache = DiskCache(str(tmp_path), 10 ** 9)
+    paths = fill(cache, 4)
+    for age, path in enumerate(reversed(paths)):
+        os.utime(path, (time.time() - 100 - age, time.time() - 100 - age))
+    size = os.path.getsize(paths[0])
+    assert cache.prune(2 * size) == 2
+    assert [os.path.exists(p) for p in paths] == [False, False, True, True]
+
+
+def test_prune_tolerates_files_removed_meanwhile(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), 10 ** 9)
+    paths = fill(cache, 3)
+    for path in paths:
+        os.utime(path, (time.time() - 100, time.time() - 100))
+    listed = cache._files()
+    os.remove(paths[0])  # another process evicts it after the listing
+    monkeypatch.setattr(cache, '_files', lambda: listed)
+    assert cache.prune(0) == 2
+    assert not any(os.path.exists(p) for p in paths)
+
+
+def test_prune_keeps_files_newer_than_its_start(tmp_path):
+    cache = DiskCache(str(tmp_path), 10 ** 9)
+    old, new = fill(cache, 2)
+    os.utime(old, (time.time() - 100, time.time() - 100))
+    os.utime(new, (time.time() + 100, time.time() + 100))  # stored while pruning
+    assert cache.prune(0) == 1
+    assert not os.path.exists(old) and os.path.exists(new)
+
+
+def test_tests_do_not_use_the_home_cache(dxf_disk_cache, tmp_path):
+    assert dxf_disk_cache.directory.startswith(str(tmp_path))
+    import pattern_cache
+    assert pattern_cache.disk_cache is dxf_disk_cache
@@ -0,0 +1,79 @@
+"""The lite R12 writer must draw what the ezdxf writer draws."""
+
+import io
+import math
+
+import ezdxf
+import pytest
+
+import dxf_lite
+from flat_patterns import add_arcs_and_connect, add_straight
+from dxf_template import part_document
+from gored_flat_pattern import add_gored_elbow, add_gored_elbow_blocks
+
+
+def flatten(entities):
+    for entity in entities:
+        if entity.dxftype() == 'INSERT':
+            yield from flatten(entity.virtual_entities())
+        else:
+            yield entity
+
+
+def geometry(layout):
+    """Return the 2D geometry of a layout, with block inserts exploded."""
+    out = []
+    for e in flatten(layout):
+        if e.dxftype() == 'LINE':
+            out.append(('LINE', *e.dxf.start.vec2, *e.dxf.end.vec2))
+        elif e.dxftype() == 'ARC':
+            out.append(('ARC', *e.dxf.center.vec2, e.dxf.radius,
+                        e.dxf.start_angle, e.dxf.end_angle))
+        elif e.dxftype() == 'LWPOLYLINE':
+            points = [tuple(p)[:2] for p in e.vertices()]
+            out.append(('POLY', e.closed, *(c for p in points for c in p)))
+        else:
+            points = [tuple(v.dxf.location)[:2] for v in e.vertices]
+            out.append(('POLY', e.is_closed, *(c for p in points for c in p)))
+    return out
+
+
+def assert_same(got, want):
+    assert len(got) == len(want)
+    for g, w in zip(got, want):
+        assert g[0] == w[0] and len(g) == len(w)
+        assert all(math.isclose(a, b, abs_tol=1e-9) for a, b in zip(g[1:], w[1:])), (g, w)
+
+
+@pytest.mark.parametrize('add, params', [
+    (add_straight, (37.7, 60.0)),
+    (add_arcs_and_connect, (20.0, 30.0, 71.4)),
+    (add_gored_elbow, (12.0, 18.0, 90.0)),
+    (add_gored_elbow_blocks, (12.0, 18.0, 90.0)),
+    (add_gored_elbow_blocks, (10.0, 15.0, 45.0, 2)),
+])
+def test_matches_ezdxf(add, params):
+    doc = ezdxf.read(io.StringIO(dxf_lite.dxf_text(add, *params)))
+    assert doc.dxfversion == 'AC1009'
+    assert doc.header['$INSUNITS'] == 1 and doc.header['$MEASUREMENT'] == 0
+    assert not doc.audit().has_errors
+
+    ref = part_document()
+    add(ref.modelspace(), *params)
+    assert_same(geometry(doc.modelspace()), geometry(ref.modelspace()))
+
+
+def test_elbow_blocks_are_r12_blocks():
+    doc = ezdxf.read(io.StringIO(dxf_lite.dxf_text(add_gored_elbow_blocks, 12.0, 18.0, 90.0, 5)))
+    inserts = doc.modelspace().query('INSERT')
+    assert len(inserts) == 5
+    names = {insert.dxf.name for insert in inserts}
+    assert len(names) == 2  # one half-gore and one full-gore block
+    for name in names:
+        assert len(doc.blocks.get(name).query('POLYLINE')) == 1
+
+
+def test_insert_needs_block():
+    layout = dxf_lite.EntityLayout()
+    with pytest.raises(ValueError):
+        layout.add_blockref('MISSING', (0, 0))
@@ -0,0 +1,61 @@
+"""Gore blocks of gored elbows sharing one document."""
+
+import io
+
+import ezdxf
+import numpy as np
+import pytest
+
+import dxf_lite
+import gored_flat_pattern
+from gored_flat_pattern import add_gored_elbow_blocks, gored_elbow_polylines
+
+
+def outlines(doc):
+    """Return the exploded outline points of every insert, sorted."""
+    points = []
+    for insert in doc.modelspace().query('INSERT'):
+        for e in insert.virtual_entities():
+            vertices = e.get_points('xy') if e.dxftype() == 'LWPOLYLINE' else e.points()
+            points.extend(tuple(np.round(tuple(p)[:2], 6)) for p in vertices)
+    return sorted(points)
+
+
+def expected(*elbows):
+    return sorted(tuple(np.round(p, 6)) for params in elbows
+                  for p in gored_elbow_polylines(*params)[0])
+
+
+def draw_both(layout):
+    add_gored_elbow_blocks(layout, 12.0, 18.0, 90.0)
+    add_gored_elbow_blocks(layout, 14.0, 20.0, 45.0)
+    add_gored_elbow_blocks(layout, 12.0, 18.0, 90.0)  # repeat shares the blocks
+
+
+def ezdxf_doc():
+    doc = ezdxf.new()
+    draw_both(doc.modelspace())
+    return doc
+
+
+def lite_doc():
+    return ezdxf.read(io.StringIO(dxf_lite.dxf_text(draw_both)))
+
+
+def test_same_gores_share_blocks():
+    doc = ezdxf_doc()
+    names = {block.name for block in doc.blocks if block.name.startswith('GORE_')}
+    assert len(names) == 4
+    assert set(outlines(doc)) == set(expected((12.0, 18.0, 90.0), (14.0, 20.0, 45.0)))
+
+
+@pytest.mark.parametrize('make_doc', [ezdxf_doc, lite_doc])
+def test_checksum_collision_keeps_geometry(monkeypatch, make_doc):
+    # Every gore shape gets the same checksum
+    monkeypatch.setattr(gored_flat_pattern.zlib, 'crc32', lambda data: 0)
+    doc = make_doc()
+    names = sorted(block.name for block in doc.blocks if block.name.startswith('GORE_'))
+    assert names == ['GORE_FULL_00000000_78', 'GORE_FULL_00000000_78_2',
+                     'GORE_HALF_00000000_38', 'GORE_HALF_00000000_38_2']
+    assert set(outlines(doc)) == set(expected((12.0, 18.0, 90.0), (14.0, 20.0, 45.0)))
+    assert len(doc.modelspace().query('INSERT')) == 15
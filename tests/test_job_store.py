@@ -0,0 +1,39 @@
+"""The job store keeps unrounded rows and rounds only its exports."""
+
+import csv
+
+from duct_core import straight_duct
+from job_store import JobStore
+from rollups import QuoteReport, display_row
+
+
+def straight_rows(count):
+    for i in range(count):
+        length = 60 + i / 7
+        circumference, weight, sqft = straight_duct(0.0598, 12.0, length, 1.0)
+        yield [f'S{i}', 'Straight', 1.0, 0.0598, 12.0, circumference, length, weight, sqft]
+
+
+def test_reopened_quote_has_exact_totals(tmp_path):
+    rows = list(straight_rows(50))
+    entered = QuoteReport(('thickness', 'type', 'diameter'))
+    entered.add_rows(rows)
+
+    with JobStore(':memory:') as store:
+        quote_id = store.open_quote('ACME', 'Q1')
+        store.add_parts(quote_id, rows)
+        table = store.load_table(quote_id)
+        assert table.rows() == rows
+        reopened = QuoteReport(('thickness', 'type', 'diameter'))
+        reopened.add_rows(table.iter_rows())
+        assert reopened.footer() == entered.footer()
+        assert store.footer(quote_id) == entered.footer()
+
+        filename = tmp_path / 'quote.csv'
+        store.export_csv(quote_id, str(filename))
+    with open(filename, newline='') as file:
+        lines = list(csv.reader(file))
+    assert lines[1] == [str(v) for v in display_row(rows[0])]
+    assert lines[1][3] == '0.0598'
+    assert lines[51] == [str(v) for v in display_row(entered.footer()[0])]
+    assert lines[52][0] == 'Total Weight 0.0598'
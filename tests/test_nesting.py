@@ -0,0 +1,58 @@
+"""Part areas and bounding boxes used by the nesting report."""
+
+import math
+
+import numpy as np
+import pytest
+
+from duct_core import DxfPart, cone_pattern
+from gored_flat_pattern import gore_outlines
+from nesting import part_area, part_extents
+
+
+def shoelace(points):
+    x, y = np.asarray(points).T
+    return abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))) / 2.0
+
+
+def bbox_area(part):
+    extents = part_extents(part)
+    return extents.width * extents.length
+
+
+def test_straight_area_is_its_bbox():
+    part = DxfPart('straight', 's', (37.7, 60.0))
+    assert part_area(part) == pytest.approx(37.7 * 60.0)
+    assert part_area(part) == pytest.approx(bbox_area(part))
+
+
+def test_cone_area_matches_sector_polygon():
+    inner, outer, angle = cone_pattern(8.0, 12.0, 18.0)[:3]
+    part = DxfPart('cone', 'c', (inner, outer, angle))
+    t = np.radians(np.linspace(0.0, angle, 20001))
+    sector = np.concatenate((np.column_stack((outer * np.cos(t), outer * np.sin(t))),
+                             np.column_stack((inner * np.cos(t), inner * np.sin(t)))[::-1]))
+    assert part_area(part) == pytest.approx(shoelace(sector), rel=1e-6)
+    assert part_area(part) < bbox_area(part)
+
+
+@pytest.mark.parametrize('params', [
+    (12.0, 18.0, 90.0), (10.0, 15.0, 45.0, 2), (24.0, 36.0, 90.0, 7)])
+def test_elbow_area_sums_every_gore(params):
+    part = DxfPart('elbow', 'e', params)
+    half_gore, full_gore, offsets = gore_outlines(*params)
+
+    def lobes(outline):
+        # Each gore lobe on one side of its crossing is a simple polygon
+        x = outline[:, 0]
+        cut = x.min() + (x.max() - x.min()) / 2.0
+        left = outline[x <= cut + 1e-12]
+        right = outline[x >= cut - 1e-12]
+        return shoelace(left) + shoelace(right)
+
+    polygons = 2 * shoelace(half_gore) + (len(offsets) - 2) * lobes(full_gore)
+    assert part_area(part) == pytest.approx(polygons, rel=2e-3)
+    # The smooth pattern: 2 * amplitude * (2 / pi) per unit length
+    total_length = 2.0 * params[1] * params[2] / 90.0
+    assert part_area(part) == pytest.approx(params[0] / math.pi * total_length, rel=5e-3)
+    assert part_area(part) < bbox_area(part)
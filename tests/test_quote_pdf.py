@@ -0,0 +1,38 @@
+"""Quote PDF layout: every table stays inside the page margins."""
+
+import pytest
+
+import quote_pdf
+from duct_table import COLUMNS
+
+
+@pytest.fixture
+def drawn(monkeypatch):
+    """Record ``(data, top, bottom)`` of every table drawn."""
+    tables = []
+    draw = quote_pdf._draw_table
+
+    def record(canv, data, col_widths, style, top):
+        bottom = draw(canv, data, col_widths, style, top)
+        tables.append((data, top, bottom))
+        return bottom
+
+    monkeypatch.setattr(quote_pdf, '_draw_table', record)
+    return tables
+
+
+def test_long_summary_continues_on_next_page(tmp_path, drawn):
+    rows = [[f'S{i}', 'Straight', 1.0, 0.04, 12.0, 37.7, 60.0, 10.0, 5.0] for i in range(30)]
+    summary = [(0.04, 300.0, 150.0)]
+    diameters = [(f'{d}-{d + 1}"', 1.0, 0.5) for d in range(150)]
+    pages = quote_pdf.write_quote_pdf(str(tmp_path / 'quote.pdf'), rows,
+                                      ['Total', 30.0, '', '', '', '', '', 300.0, 150.0],
+                                      summary, COLUMNS, groups=[('Diameter', diameters)])
+    assert pages > 2
+    for data, top, bottom in drawn:
+        assert bottom >= quote_pdf.MARGIN
+
+    parts = [table for table in drawn if table[0][0][0] == 'Diameter']
+    assert len(parts) > 1
+    assert [row for data, _, _ in parts for row in data[1:]] == [
+        [label, round(w, 2), round(s, 2)] for label, w, s in diameters]
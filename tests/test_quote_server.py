@@ -0,0 +1,224 @@
+"""Exercise the quote service over HTTP with a local client."""
+
+import csv
+import http.client
+import io
+import json
+import threading
+import time
+
+import pytest
+
+import quote_server
+from quote_server import QuoteServer, QuoteService
+
+STRAIGHT = {'name': 'S1', 'qty': 2, 'thickness': 0.04, 'diameter': 12, 'length': 60}
+CONE = {'name': 'C1', 'thickness': 0.04, 'small_diameter': 8, 'large_diameter': 12,
+        'height': 18}
+ELBOW = {'name': 'E1', 'thickness': 0.04, 'diameter': 10, 'clr': 15, 'degree': 90}
+
+
+@pytest.fixture
+def serve(tmp_path):
+    """Start a ``QuoteServer`` on a free port; return a request function."""
+    servers = []
+
+    def start(**kwargs):
+        kwargs.setdefault('workers', 1)
+        service = QuoteService(str(tmp_path / 'jobs'), **kwargs)
+        server = QuoteServer(('127.0.0.1', 0), service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+
+        def request(method, path, body=None, headers=None):
+            conn = http.client.HTTPConnection(*server.server_address, timeout=30)
+            data = body if isinstance(body, bytes) or body is None else json.dumps(body).encode()
+            conn.request(method, path, body=data, headers=headers or {})
+            response = conn.getresponse()
+            payload = response.read()
+            conn.close()
+            return response, payload
+
+        request.service = service
+        return request
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
+
+
+def as_json(payload):
+    return json.loads(payload)
+
+
+def test_health(serve):
+    request = serve()
+    response, payload = request('GET', '/health')
+    assert response.status == 200
+    assert as_json(payload)['status'] == 'ok'
+
+
+@pytest.mark.parametrize('kind, spec, type_name', [
+    ('straight', STRAIGHT, 'Straight'),
+    ('cone', CONE, 'Reducing Cone'),
+    ('elbow', ELBOW, 'Gored Elbow'),
+])
+def test_quote_and_dxf(serve, kind, spec, type_name):
+    request = serve()
+    response, payload = request('POST', f'/{kind}', spec)
+    assert response.status == 200
+    row = as_json(payload)
+    assert row['name'] == spec['name'] and row['type'] == type_name
+    assert row['weight'] > 0 and row['dxf_params']
+
+    response, payload = request('POST', f'/{kind}/dxf', spec)
+    assert response.status == 200
+    assert response.getheader('Content-Type') == 'application/dxf'
+    assert f'filename="{spec["name"]}.dxf"' in response.getheader('Content-Disposition')
+    assert payload.rstrip().endswith(b'EOF')
+
+
+def test_job(serve):
+    request = serve()
+    response, payload = request('POST', '/jobs', {'parts': [
+        dict(STRAIGHT, type='straight'), dict(CONE, type='cone'), dict(ELBOW, type='elbow')]})
+    assert response.status == 202
+    job_id = as_json(payload)['id']
+
+    deadline = time.monotonic() + 60
+    while True:
+        response, payload = request('GET', f'/jobs/{job_id}')
+        info = as_json(payload)
+        if info['status'] not in ('queued', 'running'):
+            break
+        assert time.monotonic() < deadline, 'job did not finish'
+        time.sleep(0.05)
+    assert info['status'] == 'done' and info['drawn'] == 3 and not info['errors']
+
+    response, payload = request('GET', f'/jobs/{job_id}/csv')
+    assert response.status == 200
+    assert payload.decode().splitlines()[1].startswith('S1,Straight,')
+    response, payload = request('GET', f'/jobs/{job_id}/dxf/C1.dxf')
+    assert response.status == 200 and payload.rstrip().endswith(b'EOF')
+    response, _ = request('GET', f'/jobs/{job_id}/dxf/missing')
+    assert response.status == 404
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/cone', dict(CONE, small_diameter=12)),     # no taper: division by zero
+    ('/cone', dict(CONE, small_diameter=14)),     # inverted
+    ('/cone/dxf', dict(CONE, height=0)),
+    ('/straight', {'thickness': 0.04, 'diameter': 'wide', 'length': 60}),
+    ('/elbow', {'thickness': 0.04}),
+    ('/jobs', {'parts': []}),
+    ('/jobs', {'parts': [dict(CONE, type='cone', large_diameter=8)]}),
+    ('/jobs', {'parts': [{'type': 'oval'}]}),
+])
+def test_bad_request(serve, path, body):
+    request = serve()
+    response, payload = request('POST', path, body)
+    assert response.status == 400
+    assert as_json(payload)['error']
+
+
+@pytest.mark.parametrize('kind, spec', [
+    ('straight', STRAIGHT), ('cone', CONE), ('elbow', ELBOW)])
+@pytest.mark.parametrize('value', [0, -1, 'nan', 'inf', '-inf'])
+def test_rejects_non_positive_and_non_finite(serve, kind, spec, value):
+    request = serve()
+    for field in ('qty', *quote_server.KINDS[kind][1]):
+        # NaN and infinity aren't JSON, so they arrive as strings
+        response, payload = request('POST', f'/{kind}', dict(spec, **{field: value}))
+        assert response.status == 400, field
+        assert field in as_json(payload)['error']
+
+
+def test_job_footer_is_exact(serve):
+    request = serve()
+    parts = [dict(STRAIGHT, type='straight', name=f'S{i}', length=60 + i / 3)
+             for i in range(10)]
+    response, payload = request('POST', '/jobs', {'parts': parts, 'dxf': False})
+    job = request.service.job(as_json(payload)['id'])
+    deadline = time.monotonic() + 60
+    while job.status not in ('done', 'failed'):
+        assert time.monotonic() < deadline, 'job did not finish'
+        time.sleep(0.05)
+    assert job.status == 'done'
+
+    rows = [request.service.calculate('straight', part) for part in parts]
+    info = as_json(request('GET', f'/jobs/{job.id}')[1])
+    assert info['total_weight'] == job.report.total.weight
+    assert abs(info['total_weight'] - sum(row['weight'] for row in rows)) < 0.01 * len(rows)
+    lines = list(csv.reader(io.StringIO(request('GET', f'/jobs/{job.id}/csv')[1].decode())))
+    assert lines[1] == [str(v) for v in rows[0].values()][:9]
+    footer = quote_server.display_row(job.report.footer()[0])
+    assert lines[len(parts) + 1] == [str(v) for v in footer]
+
+
+def test_not_json(serve):
+    request = serve()
+    response, payload = request('POST', '/straight', b'{"name": ')
+    assert response.status == 400
+    assert 'JSON' in as_json(payload)['error']
+
+
+def test_not_found(serve):
+    request = serve()
+    assert request('GET', '/nowhere')[0].status == 404
+    assert request('POST', '/oval', STRAIGHT)[0].status == 404
+    assert request('GET', '/jobs/0123456789ab')[0].status == 404
+
+
+def test_body_too_large(serve):
+    request = serve()
+    headers = {'Content-Length': str(quote_server.MAX_BODY + 1)}
+    response, payload = request('POST', '/straight', headers=headers)
+    assert response.status == 413
+
+
+def test_dxf_slots_busy(serve, monkeypatch):
+    monkeypatch.setattr(quote_server, 'SLOT_TIMEOUT', 0.01)
+    request = serve()
+    slots = request.service._slots
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+    try:
+        response, payload = request('POST', '/straight/dxf', STRAIGHT)
+    finally:
+        for _ in range(taken):
+            slots.release()
+    assert response.status == 503
+    assert response.getheader('Retry-After') == '1'
+    assert request('POST', '/straight/dxf', STRAIGHT)[0].status == 200
+
+
+def test_job_queue_full_and_conflict(serve):
+    # Without job threads nothing leaves the queue
+    request = serve(job_threads=0, max_jobs=1)
+    job = {'parts': [dict(STRAIGHT, type='straight')], 'dxf': False}
+    response, payload = request('POST', '/jobs', job)
+    assert response.status == 202
+    job_id = as_json(payload)['id']
+    response, payload = request('POST', '/jobs', job)
+    assert response.status == 503 and response.getheader('Retry-After') == '1'
+    response, payload = request('GET', f'/jobs/{job_id}/csv')
+    assert response.status == 409
+    assert as_json(payload)['error'] == 'job is queued'
+
+
+def test_unexpected_error(serve, monkeypatch, capsys):
+    request = serve()
+
+    def broken(kind, spec):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(request.service, 'calculate', broken)
+    response, payload = request('POST', '/straight', STRAIGHT)
+    assert response.status == 500
+    assert as_json(payload) == {'error': 'OSError: disk full'}
+    assert 'disk full' in capsys.readouterr().err
+    # The server keeps answering
+    assert request('GET', '/health')[0].status == 200
@@ -0,0 +1,23 @@
+"""The GUI and the command line must start without the drawing/report libraries."""
+
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    'startup', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'benchmarks', 'startup.py'))
+startup = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(startup)
+
+# Generous: a cold import measures ~15 ms for ductCalc and ~60 ms for the GUI
+MAX_MS = 1000.0
+
+
+@pytest.mark.parametrize('module', ['duct_core', 'ductCalc', 'duct_gui'])
+def test_import_is_light(module):
+    ms, packages = startup.import_profile(module)
+    assert not packages.intersection(startup.HEAVY), sorted(packages.intersection(startup.HEAVY))
+    assert 'ductCalc' not in packages or module == 'ductCalc'
+    assert ms is not None and ms < MAX_MS
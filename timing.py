@@ -0,0 +1,168 @@
+"""Per-stage timings and profiling for the calculate/draw/export pipeline.
+
+Code marks its stages with ``with stage('build_dxf'):``. The stages used are
+
+* ``compute``      flat-pattern geometry and costing of a part
+* ``build_dxf``    building the ezdxf document and exporting its text
+* ``save_dxf``     writing the DXF file
+* ``dxf_cache``    looking parts up in / adding them to the on-disk DXF cache
+* ``persist_row``  saving the row to the job store / quote CSV
+* ``refresh_ui``   updating the Treeview and totals
+* ``export_pdf``   writing the PDF report
+
+Timing is off unless ``DUCTCALC_TIMING=1`` is set (or :func:`enable` is
+called, e.g. by ``ductCalc.py --timings``); while off, :func:`stage` hands
+back a shared no-op context manager, so the instrumentation costs about a
+function call per stage. When on, a summary of every stage is printed to
+stderr at exit. ``DUCTCALC_PROFILE=FILE`` (or ``--profile FILE``)
+additionally runs cProfile and writes the pstats file at exit; read it with
+``python -m pstats FILE``.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+# Parts the rolling averages are taken over
+WINDOW = 50
+
+enabled = False
+
+_NULL = contextlib.nullcontext()
+_lock = threading.Lock()
+_stats: Dict[str, StageStats] = {}
+_profile_path: Optional[str] = None
+_profilers = []
+
+
+class StageStats:
+    """Call count and durations of one stage, in seconds."""
+
+    __slots__ = ('count', 'total', 'max', 'recent')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def rolling_mean(self) -> float:
+        return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+
+class _Stage:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        record(self.name, time.perf_counter() - self.start)
+
+
+def stage(name: str):
+    """Return a context manager timing the ``name`` stage (no-op when off)."""
+    if not enabled:
+        return _NULL
+    return _Stage(name)
+
+
+def record(name: str, seconds: float) -> None:
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = StageStats()
+        stats.add(seconds)
+
+
+def stats() -> Dict[str, StageStats]:
+    with _lock:
+        return dict(_stats)
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+
+
+def summary() -> str:
+    """Return a table of every stage's count and timings."""
+    lines = [f"{'stage':<12}{'count':>8}{'total s':>10}{'mean ms':>10}{'max ms':>10}"]
+    for name, s in sorted(stats().items()):
+        lines.append(f"{name:<12}{s.count:>8}{s.total:>10.3f}"
+                     f"{s.mean * 1e3:>10.3f}{s.max * 1e3:>10.3f}")
+    return '\n'.join(lines)
+
+
+def rolling_line() -> str:
+    """Return a one-line summary of the recent mean of every stage."""
+    return ' | '.join(f"{name} {s.rolling_mean * 1e3:.1f} ms"
+                      for name, s in sorted(stats().items()))
+
+
+def _print_summary() -> None:
+    if _stats:
+        print(summary(), file=sys.stderr)
+
+
+def enable(profile: Optional[str] = None) -> None:
+    """Turn timing on and, with ``profile``, cProfile the calling thread."""
+    global enabled, _profile_path
+    if not enabled:
+        enabled = True
+        atexit.register(_print_summary)
+    if profile and _profile_path is None:
+        _profile_path = profile
+        atexit.register(_dump_profile)
+        profile_thread()
+
+
+def profile_thread() -> Optional[cProfile.Profile]:
+    """Profile the calling thread as well, if profiling is on.
+
+    cProfile only sees the thread it was enabled on, so worker threads call
+    this when they start and ``disable()`` the returned profiler when they
+    finish; their results are merged into the same pstats file.
+    """
+    if _profile_path is None:
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    _profilers.append(profiler)
+    return profiler
+
+
+def _dump_profile() -> None:
+    import pstats
+
+    _profilers[0].disable()  # the thread that called enable()
+    pstats.Stats(*_profilers).dump_stats(_profile_path)
+    print(f"Profile written to {_profile_path}", file=sys.stderr)
+
+
+if os.environ.get('DUCTCALC_TIMING', '') not in ('', '0'):
+    enable(os.environ.get('DUCTCALC_PROFILE'))
+elif os.environ.get('DUCTCALC_PROFILE'):
+    enable(os.environ['DUCTCALC_PROFILE'])